@@ -0,0 +1,59 @@
+import hashlib
+import json
+import os
+import shutil
+
+import joblib
+import sklearn
+
+
+CACHE_DIR = "model_cache"
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def artifact_key(data_file, params):
+    # Pickled estimators are only valid for the sklearn version that wrote them, so it is part of the key too.
+    config = json.dumps({'params': params, 'sklearn': sklearn.__version__}, sort_keys=True)
+    digest = hashlib.sha256((file_hash(data_file) + config).encode())
+    return digest.hexdigest()[:16]
+
+
+def artifact_path(key, name):
+    return os.path.join(CACHE_DIR, key, name + ".joblib")
+
+
+def has_artifact(key, name):
+    return os.path.exists(artifact_path(key, name))
+
+
+def load_artifact(key, name, mmap=True):
+    path = artifact_path(key, name)
+    if not os.path.exists(path):
+        return None
+    return joblib.load(path, mmap_mode='r' if mmap else None)
+
+
+def save_artifact(key, name, obj):
+    path = artifact_path(key, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    joblib.dump(obj, tmp_path)
+    os.replace(tmp_path, path)
+    return path
+
+
+def copy_artifact(old_key, new_key, name):
+    old_path = artifact_path(old_key, name)
+    if not os.path.exists(old_path):
+        return False
+    new_path = artifact_path(new_key, name)
+    os.makedirs(os.path.dirname(new_path), exist_ok=True)
+    shutil.copyfile(old_path, new_path)
+    return True
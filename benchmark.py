@@ -0,0 +1,186 @@
+import argparse
+import json
+import multiprocessing
+import os
+import pickle
+import platform
+import resource
+import subprocess
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from schema import FLAG_COLUMNS, GENRE_MAPPING, PRICE_MAPPING, THEME_MAPPING
+
+
+PRICES = list(PRICE_MAPPING)
+GENRES = list(GENRE_MAPPING)
+THEMES = list(THEME_MAPPING)
+FLAGS = list(FLAG_COLUMNS)
+SIZES = [10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6]
+STAGES = ['encode', 'cached_load', 'train', 'slice_models', 'breakdown', 'kpis', 'predict', 'flat_predict']
+RESULTS_DIR = "benchmark_results"
+
+
+def synthetic_games(rows, seed=42):
+    rng = np.random.default_rng(seed)
+    price = rng.integers(0, len(PRICES), rows)
+    genre = rng.integers(0, len(GENRES), rows)
+    theme = rng.integers(0, len(THEMES), rows)
+    flags = (rng.random((rows, len(FLAGS))) < 0.3).astype(np.int64)
+
+    copies = 200000 + 150000 * price + 80000 * (len(GENRES) - genre) + flags @ rng.normal(60000, 90000, len(FLAGS))
+    copies = np.maximum(copies * rng.lognormal(0, 0.5, rows), 1000).astype(np.int64)
+
+    games = pd.DataFrame({'Copies_per_year': copies, 'Price': np.array(PRICES)[price],
+                          'Genre': np.array(GENRES)[genre], 'Theme': np.array(THEMES)[theme]})
+    return pd.concat([games, pd.DataFrame(flags, columns=FLAGS)], axis=1)
+
+
+def peak_rss_mb():
+    # ru_maxrss is reported in kilobytes on Linux and bytes on macOS.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if platform.system() == 'Darwin' else peak / 1024
+
+
+def run_stage(stage, data_file, cache_dir, n_estimators, engine, results):
+    import artifact_cache
+    import data_getters
+    import dataset_cache
+    import kpis
+    import model
+    import slice_models
+    from flat_forest import FlatForest
+
+    artifact_cache.CACHE_DIR = cache_dir
+    model.MODEL_PARAMS['n_estimators'] = n_estimators
+    # A local model_config.json must not leak into the benchmark; the engine is chosen on the command line.
+    model.CONFIG_FILE = os.path.join(cache_dir, "model_config.json")
+    model.DEFAULT_ENGINE = engine
+
+    # Everything a stage depends on is loaded from the artifact cache before the clock starts.
+    if stage == 'cached_load':
+        dataset_cache.write_dataset_cache(dataset_cache.parse_csv(data_file), dataset_cache.cache_path(data_file))
+    if stage in ('slice_models', 'kpis', 'predict', 'flat_predict'):
+        artifact = model.load_model(data_file)
+    if stage == 'breakdown':
+        data_getters.initialize_model(data_file=data_file)
+    if stage == 'flat_predict':
+        flat = FlatForest.from_sklearn(artifact['model'])
+
+    extra = {}
+    rss_before = peak_rss_mb()
+    started = time.perf_counter()
+    if stage == 'encode':
+        rows = len(dataset_cache.parse_csv(data_file))
+    elif stage == 'cached_load':
+        rows = len(dataset_cache.read_dataset_cache(dataset_cache.cache_path(data_file)))
+    elif stage == 'train':
+        trained = model.load_model(data_file)
+        rows = len(trained['X_train'])
+    elif stage == 'slice_models':
+        slice_models.prepare_slice_models(artifact['data'], model.model_key(data_file), engine)
+        rows = len(artifact['data'])
+    elif stage == 'breakdown':
+        for code in data_getters.GENRE_CODES:
+            data_getters.model_by_genre(data_getters.all_mapping(code))
+        for code in data_getters.THEME_CODES:
+            data_getters.model_by_theme(data_getters.all_mapping(code))
+        rows = len(data_getters.current_context().data)
+    elif stage == 'kpis':
+        kpis.compute_kpis(artifact)
+        rows = len(artifact['y_test'])
+    elif stage == 'predict':
+        artifact['model'].predict(artifact['data'].drop('Copies_per_year', axis=1))
+        rows = len(artifact['data'])
+    elif stage == 'flat_predict':
+        flat.predict(artifact['data'].drop('Copies_per_year', axis=1))
+        rows = len(artifact['data'])
+    seconds = time.perf_counter() - started
+    if stage == 'train':
+        extra['model_mb'] = len(pickle.dumps(trained['model'], protocol=pickle.HIGHEST_PROTOCOL)) / (1024 * 1024)
+
+    results.put({'stage': stage, 'seconds': seconds, 'rows': rows, 'rows_per_second': rows / seconds,
+                 'peak_rss_mb': peak_rss_mb(), 'rss_growth_mb': peak_rss_mb() - rss_before, **extra})
+
+
+def measure(stage, data_file, cache_dir, n_estimators, engine='forest'):
+    # Each stage gets a fresh process so its peak RSS is not inflated by the stages before it.
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    process = context.Process(target=run_stage, args=(stage, data_file, cache_dir, n_estimators, engine,
+                                                                 results))
+    process.start()
+    process.join()
+    if process.exitcode != 0:
+        raise RuntimeError(f"Benchmark stage {stage} failed for {data_file}")
+    return results.get()
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run_benchmarks(sizes=SIZES, stages=STAGES, n_estimators=100, seed=42, engine='forest'):
+    import sklearn
+
+    report = {'commit': git_commit(), 'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+              'python': platform.python_version(), 'sklearn': sklearn.__version__, 'cpus': os.cpu_count(),
+              'engine': engine, 'n_estimators': n_estimators, 'results': []}
+    if engine != 'forest':
+        # Only a random forest can be flattened.
+        stages = [stage for stage in stages if stage != 'flat_predict']
+    with tempfile.TemporaryDirectory() as work_dir:
+        for rows in sizes:
+            data_file = os.path.join(work_dir, f"games_{rows}.csv")
+            synthetic_games(rows, seed).to_csv(data_file, index=False)
+            cache_dir = os.path.join(work_dir, f"cache_{rows}")
+            for stage in stages:
+                result = dict(measure(stage, data_file, cache_dir, n_estimators, engine), size=rows)
+                report['results'].append(result)
+                model_size = f"  {result['model_mb']:8.1f} MB model" if 'model_mb' in result else ""
+                print(f"{rows:>8} rows  {stage:<13} {result['seconds']:9.3f}s  "
+                      f"{result['rows_per_second']:12.0f} rows/s  {result['peak_rss_mb']:8.1f} MB peak{model_size}")
+    return report
+
+
+def compare(baseline_file, report):
+    with open(baseline_file) as f:
+        baseline = {(r['size'], r['stage']): r for r in json.load(f)['results']}
+    for result in report['results']:
+        old = baseline.get((result['size'], result['stage']))
+        if old is not None:
+            print(f"{result['size']:>8} rows  {result['stage']:<13} {result['seconds'] / old['seconds']:6.2f}x time  "
+                  f"{result['peak_rss_mb'] / old['peak_rss_mb']:6.2f}x peak RSS")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark each pipeline stage on synthetic datasets.")
+    parser.add_argument("--sizes", type=int, nargs='+', default=SIZES, help="synthetic dataset row counts")
+    parser.add_argument("--stages", nargs='+', choices=STAGES, default=STAGES)
+    parser.add_argument("--n-estimators", type=int, default=100, help="forest size used for the benchmark")
+    parser.add_argument("--engine", choices=['forest', 'hist_gb'], default='forest', help="training engine to benchmark")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="JSON results file (default: benchmark_results/<commit>.json)")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(args.sizes, args.stages, args.n_estimators, args.seed, args.engine)
+    suffix = "" if args.engine == 'forest' else f"_{args.engine}"
+    output = args.output or os.path.join(RESULTS_DIR, f"{report['commit']}{suffix}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+    if args.compare:
+        compare(args.compare, report)
+
+
+if __name__ == "__main__":
+    main()
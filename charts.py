@@ -0,0 +1,149 @@
+import argparse
+import time
+
+from schema import CODE_TO_NAME, GENRE_NAMES, THEME_NAMES
+
+
+BAR_WIDTH = 0.35
+GROUP_LABELS = {'Genre': 'Genres', 'Theme': 'Themes'}
+GROUP_CODES = {'Genre': tuple(GENRE_NAMES), 'Theme': tuple(THEME_NAMES)}
+# Headroom above the tallest bar, matching matplotlib's default autoscale margin.
+Y_MARGIN = 0.05
+
+
+class BreakdownChart:
+    # Bars, ticks and the legend are created once; a new selection only changes bar heights, the y range and the
+    # title, so the canvas can repaint without rebuilding any artists.
+    def __init__(self, ax, group_column, codes=None):
+        self.ax = ax
+        self.group_column = group_column
+        self.codes = list(GROUP_CODES[group_column] if codes is None else codes)
+
+        index = [code - BAR_WIDTH / 2 for code in self.codes]
+        self.actual = ax.bar(index, [0] * len(index), BAR_WIDTH, label='Actual')
+        self.predicted = ax.bar([i + BAR_WIDTH for i in index], [0] * len(index), BAR_WIDTH, label='Predicted')
+
+        ax.set_xlabel(GROUP_LABELS[group_column])
+        ax.set_ylabel('Sales')
+        self.title = ax.set_title(f'Actual vs Predicted Sales by {group_column}')
+        ax.set_xticks([i + BAR_WIDTH / 2 for i in index])
+        ax.set_xticklabels([CODE_TO_NAME[code] for code in self.codes], rotation=45, ha="right")
+        ax.legend()
+        self.canvas = None
+        self.background = None
+
+    def animated_artists(self):
+        return [*self.actual, *self.predicted, *self.ax.spines.values(), self.ax.yaxis, self.title,
+                self.ax.get_legend()]
+
+    def enable_blitting(self, canvas):
+        # Everything that changes between selections is left out of a cached background, which is re-captured
+        # whenever the canvas does a full draw (first show, resize). Updates then repaint only those artists.
+        self.canvas = canvas
+        for artist in self.animated_artists():
+            artist.set_animated(True)
+        canvas.mpl_connect('draw_event', self.on_draw)
+
+    def on_draw(self, event):
+        self.background = self.canvas.copy_from_bbox(self.canvas.figure.bbox)
+        self.draw_animated()
+
+    def draw_animated(self):
+        for artist in self.animated_artists():
+            self.ax.figure.draw_artist(artist)
+
+    def refresh(self):
+        if self.background is None:
+            self.canvas.draw_idle()
+            return
+        self.canvas.restore_region(self.background)
+        self.draw_animated()
+        self.canvas.blit(self.canvas.figure.bbox)
+
+    def update(self, grouped_df, title=None):
+        values = grouped_df.set_index(self.group_column).reindex(self.codes, fill_value=0)
+        for bars, column in ((self.actual, 'Actual_Sales'), (self.predicted, 'Predicted_Sales')):
+            for bar, height in zip(bars, values[column]):
+                bar.set_height(height)
+
+        heights = values[['Actual_Sales', 'Predicted_Sales']].to_numpy()
+        low, high = min(heights.min(), 0), max(heights.max(), 0)
+        span = (high - low) or 1
+        self.ax.set_ylim(low - (Y_MARGIN * span if low < 0 else 0), high + Y_MARGIN * span)
+        self.title.set_text(title or f'Actual vs Predicted Sales by {self.group_column}')
+
+
+def draw_breakdown(ax, grouped_df, group_column, title=None):
+    chart = BreakdownChart(ax, group_column, list(grouped_df[group_column]))
+    chart.update(grouped_df, title)
+    return chart
+
+
+def draw_residuals(ax, y_pred, residuals):
+    import seaborn as sns
+
+    sns.scatterplot(x=y_pred, y=residuals, ax=ax)
+    ax.axhline(0, color='red', linestyle='--', linewidth=2)
+    ax.set_title("Residual Plot")
+    ax.set_xlabel("Predicted Values")
+    ax.set_ylabel("Residuals")
+
+
+def benchmark(repeats=5):
+    # Renders off-screen with Agg so it runs headless; the Tk canvas paints the same Agg buffer.
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    import data_getters
+
+    data_getters.initialize_model()
+    selections = [(name, data_getters.model_by_genre(name), 'Theme') for name in GENRE_NAMES.values()]
+    selections += [(name, data_getters.model_by_theme(name), 'Genre') for name in THEME_NAMES.values()]
+
+    results = {}
+    for group_column in GROUP_LABELS:
+        grouped = [(name, df) for name, df, column in selections if column == group_column]
+        canvases = [FigureCanvasAgg(Figure(figsize=(8, 6))) for _ in range(3)]
+        rebuild_ax = canvases[0].figure.add_subplot(111)
+        update_chart = BreakdownChart(canvases[1].figure.add_subplot(111), group_column)
+        blit_chart = BreakdownChart(canvases[2].figure.add_subplot(111), group_column)
+        blit_chart.enable_blitting(canvases[2])
+        for canvas in canvases:
+            canvas.draw()
+
+        def rebuild(grouped_df):
+            rebuild_ax.clear()
+            draw_breakdown(rebuild_ax, grouped_df, group_column)
+            canvases[0].draw()
+
+        def update(grouped_df):
+            update_chart.update(grouped_df)
+            canvases[1].draw()
+
+        def blit(grouped_df):
+            blit_chart.update(grouped_df)
+            blit_chart.refresh()
+
+        results[group_column] = {}
+        for mode, redraw in (('rebuild', rebuild), ('update', update), ('blit', blit)):
+            started = time.perf_counter()
+            for _ in range(repeats):
+                for name, grouped_df in grouped:
+                    redraw(grouped_df)
+            results[group_column][f'{mode}_ms'] = 1000 * (time.perf_counter() - started) / (repeats * len(grouped))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time a breakdown chart redraw: clear-and-rebuild versus updating "
+                                                 "persistent bars.")
+    parser.add_argument("--repeats", type=int, default=5, help="passes over every genre and theme")
+    args = parser.parse_args(argv)
+
+    for group_column, result in benchmark(args.repeats).items():
+        print(f"by {group_column:<5}  clear and rebuild {result['rebuild_ms']:7.2f} ms  "
+              f"update + full draw {result['update_ms']:7.2f} ms  update + blit {result['blit_ms']:7.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,146 +1,145 @@
 import pandas as pd
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.metrics import explained_variance_score, mean_squared_error, r2_score
 
-from model import all_data
+from instrumentation import instrument
+from model import DATA_FILE
+from model_context import load_context
+from schema import CATEGORY_COLUMNS, CODE_TO_NAME, FLAG_COLUMNS, NAME_TO_CODE
+from slice_models import GENRE_CODES, THEME_CODES
+from what_if import encode_game, explore
 
+# Thresholds on a feature's share of the total permutation importance, in percent.
+BEST_SHARE = 3.0
+WORST_SHARE = 1.0
 
-def initialize_model():
-    global df, model, test, predict, indv
-    df, model, test, predict = all_data()
-    indv = df.drop('Copies_per_year', axis=1)
+# The context the getters use when none is passed. Swapping models is a single reference assignment, so a reader
+# always sees either the old context or the new one, never a mix.
+context = None
 
 
-def get_feature_import():
-    import_sum, value = 0, 0
-    sales_impact = []
-    column_indices = [indv.columns.get_loc(col) for col in indv.columns]
-    for header in column_indices:
-        value = model.feature_importances_[header]
-        import_sum = import_sum + value
-    for header in range(0, 3):
-        import_value = model.feature_importances_[header]
-        title = indv.columns[header]
-        import_percent = (import_value / import_sum) * 100
-        sales_impact.append((title, import_percent))
-    return sales_impact
+def set_context(ctx):
+    global context
+    context = ctx
 
 
-def get_best_features():
-    best_features = []
-    for header in range(3, 30):
-        if model.feature_importances_[header] > 0.03:
-            best_features.append(indv.columns[header])
-    return best_features
+def current_context(ctx=None):
+    ctx = ctx or context
+    if ctx is None:
+        raise RuntimeError("The model has not been initialized; call initialize_model() first")
+    return ctx
 
 
-def get_worst_features():
-    worst_features = []
-    for header in range(3, 30):
-        if model.feature_importances_[header] < 0.01:
-            worst_features.append(indv.columns[header])
-    return worst_features
+@instrument("initialize_model")
+def initialize_model(progress=None, data_file=DATA_FILE):
+    ctx = load_context(data_file, progress)
+    set_context(ctx)
+    return ctx
 
 
-def get_mse():
-    mse = mean_squared_error(test, predict)
-    return mse
+@instrument("get_feature_import")
+def get_feature_import(ctx=None):
+    ctx = current_context(ctx)
+    headline = ctx.importances.loc[ctx.importances.index.intersection(CATEGORY_COLUMNS, sort=False)]
+    return list(headline[['share', 'share_ci_low', 'share_ci_high']].itertuples(name=None))
 
 
-def get_explained_var():
-    explained_var = explained_variance_score(test, predict)
-    return explained_var
+@instrument("get_best_features")
+def get_best_features(ctx=None):
+    ctx = current_context(ctx)
+    flags = ctx.importances.loc[ctx.importances.index.intersection(FLAG_COLUMNS, sort=False)]
+    # Only features whose whole confidence interval is above zero count as important.
+    best = flags[(flags['share'] > BEST_SHARE) & (flags['ci_low'] > 0)]
+    return list(best.sort_values('share', ascending=False).index)
 
 
-def get_r2():
-    r2 = r2_score(test, predict)
-    return r2
+@instrument("get_worst_features")
+def get_worst_features(ctx=None):
+    ctx = current_context(ctx)
+    flags = ctx.importances.loc[ctx.importances.index.intersection(FLAG_COLUMNS, sort=False)]
+    return list(flags[flags['share'] < WORST_SHARE].sort_values('share').index)
 
 
-def get_residuals():
-    test_array = test.values.flatten()
-    residuals = (test_array - predict)
-    return residuals
+@instrument("get_kpis")
+def get_kpis(ctx=None):
+    return current_context(ctx).kpis
 
 
-def get_y_pred():
-    return predict
+@instrument("get_mse")
+def get_mse(ctx=None):
+    return current_context(ctx).kpis['mse']
 
 
-def get_variance():
-    low_val = 0
-    high_val = 0
-    for v in test.values:
-        if float(v) < low_val:
-            low_val = float(v)
-        if float(v) > high_val:
-            high_val = float(v)
-    variance = high_val - low_val
-    return variance
+@instrument("get_explained_var")
+def get_explained_var(ctx=None):
+    return current_context(ctx).kpis['explained_variance']
 
 
-def model_by_genre(selected_genre):
-    num_genre = all_mapping(selected_genre)
-    genre_subset = df[df['Genre'] == num_genre]
-    grouped_df = pd.DataFrame(columns=['Theme', 'Actual_Sales', 'Predicted_Sales'])
+@instrument("get_r2")
+def get_r2(ctx=None):
+    return current_context(ctx).kpis['r2']
 
-    X = genre_subset.drop('Copies_per_year', axis=1)
-    y = genre_subset['Copies_per_year']
-    mini_model = RandomForestRegressor()
-    mini_model.fit(X, y)
 
-    for theme in range(10):
-        theme_data = genre_subset[genre_subset['Theme'] == theme]
-        if not theme_data.empty:
-            avg_actual_sales = theme_data['Copies_per_year'].mean()
-            avg_predicted_sales = mini_model.predict(theme_data.drop('Copies_per_year', axis=1)).mean()
-        else:
-            avg_actual_sales = 0
-            avg_predicted_sales = 0
+@instrument("get_residuals")
+def get_residuals(ctx=None):
+    return current_context(ctx).kpis['residuals']
 
-        grouped_df = pd.concat([grouped_df, pd.DataFrame({'Theme': [theme], 'Actual_Sales': [avg_actual_sales],
-                                                          'Predicted_Sales': [avg_predicted_sales]})])
 
-    return grouped_df.reset_index(drop=True)
+@instrument("get_y_pred")
+def get_y_pred(ctx=None):
+    return current_context(ctx).y_pred
 
 
-def model_by_theme(selected_theme):
-    num_theme = all_mapping(selected_theme)
-    theme_subset = df[df['Theme'] == num_theme]
-    grouped_df = pd.DataFrame(columns=['Genre', 'Actual_Sales', 'Predicted_Sales'])
+@instrument("get_variance")
+def get_variance(ctx=None):
+    return current_context(ctx).kpis['variance']
 
-    X = theme_subset.drop('Copies_per_year', axis=1)
-    y = theme_subset['Copies_per_year']
-    mini_model = RandomForestRegressor()
-    mini_model.fit(X, y)
 
-    for genre in range(11, 17):
-        genre_data = theme_subset[theme_subset['Genre'] == genre]
-        if not genre_data.empty:
-            avg_actual_sales = genre_data['Copies_per_year'].mean()
-            avg_predicted_sales = mini_model.predict(genre_data.drop('Copies_per_year', axis=1)).mean()
-        else:
-            avg_actual_sales = 0
-            avg_predicted_sales = 0
+@instrument("what_if")
+def what_if(game, pairs=False, ctx=None):
+    ctx = current_context(ctx)
+    return explore(ctx.model, ctx.scaler, encode_game(game), ctx.features.columns, pairs)
 
-        grouped_df = pd.concat([grouped_df, pd.DataFrame({'Genre': [genre], 'Actual_Sales': [avg_actual_sales],
-                                                          'Predicted_Sales': [avg_predicted_sales]})])
 
-    return grouped_df.reset_index(drop=True)
+@instrument("get_slice_dependence")
+def get_slice_dependence(kind, name, ctx=None):
+    # Flag effects, the price curve and the top interactions for one genre or theme, if they have been computed.
+    ctx = current_context(ctx)
+    if ctx.dependence is None:
+        return None
+    return ctx.dependence.get((kind, all_mapping(name)))
 
 
-def all_mapping(key):
+def slice_breakdown(subset, mini_model, group_column, codes):
+    grouped_df = pd.DataFrame({group_column: subset[group_column], 'Actual_Sales': subset['Copies_per_year']})
+    if not subset.empty:
+        grouped_df['Predicted_Sales'] = mini_model.predict(subset.drop('Copies_per_year', axis=1))
+    else:
+        grouped_df['Predicted_Sales'] = pd.Series(dtype=float)
+
+    grouped_df = grouped_df.groupby(group_column)[['Actual_Sales', 'Predicted_Sales']].mean()
+    grouped_df = grouped_df.reindex(pd.Index(codes, name=group_column), fill_value=0)
+    return grouped_df.reset_index()
+
 
-    forward_map = {"Anime": 0, "Horror": 1, "Mystery": 2, "Science-fiction": 3, "Fantasy": 4, "Post-apocalyptic": 5,
-                   "History": 6, "Modern": 7, "War": 8, "Superhero": 9, "Action-Adventure": 11, "Party Games": 17,
-                   "Role-Playing": 12, "Strategy": 13, "Simulation": 14, "Sports and Racing": 15, "Visual Novels": 16}
+@instrument("model_by_genre")
+def model_by_genre(selected_genre, ctx=None):
+    ctx = current_context(ctx)
+    num_genre = all_mapping(selected_genre)
+    genre_subset = ctx.data[ctx.data['Genre'] == num_genre]
+    mini_model = ctx.slice_model('genre', num_genre)
+    return slice_breakdown(genre_subset, mini_model, 'Theme', THEME_CODES)
+
+
+@instrument("model_by_theme")
+def model_by_theme(selected_theme, ctx=None):
+    ctx = current_context(ctx)
+    num_theme = all_mapping(selected_theme)
+    theme_subset = ctx.data[ctx.data['Theme'] == num_theme]
+    mini_model = ctx.slice_model('theme', num_theme)
+    return slice_breakdown(theme_subset, mini_model, 'Genre', GENRE_CODES)
 
-    backward_map = {11: "Action-Adventure", 12: "Role-Playing", 13: "Strategy", 14: "Simulation", 15: "Sports and Racing",
-                    16: "Visual Novels", 17: "Party Games", 0: "Anime", 1: "Horror", 2: "Mystery", 3: "Science-fiction",
-                    4: "Fantasy", 5: "Post-apocalyptic", 6: "History", 7: "Modern", 8: "War", 9: "Superhero"}
 
+@instrument("all_mapping")
+def all_mapping(key):
     if isinstance(key, int):
-        definition = backward_map.get(key)
-    else:
-        definition = forward_map.get(key)
-    return definition
+        return CODE_TO_NAME.get(key)
+    return NAME_TO_CODE.get(key)
@@ -0,0 +1,54 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import span
+from schema import CATEGORY_COLUMNS, COLUMNS, CSV_DTYPES, FLAG_COLUMNS, TARGET, encode_categories
+
+
+CACHE_SUFFIX = ".cache.npz"
+
+
+def cache_path(data_file):
+    return os.path.splitext(data_file)[0] + CACHE_SUFFIX
+
+
+def cache_is_fresh(data_file):
+    path = cache_path(data_file)
+    return os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(data_file)
+
+
+def parse_csv(data_file):
+    with span("read_csv"):
+        games = pd.read_csv(data_file, usecols=list(COLUMNS), dtype=dict(CSV_DTYPES))
+    with span("encode"):
+        return encode_categories(games)
+
+
+def write_dataset_cache(games, path):
+    # The 27 flags are bit-packed into 4 bytes per row; categories are already int8 codes.
+    arrays = {column: games[column].to_numpy() for column in (TARGET,) + CATEGORY_COLUMNS}
+    arrays['flags'] = np.packbits(games[list(FLAG_COLUMNS)].to_numpy(dtype=np.uint8), axis=1)
+    arrays['columns'] = np.array(games.columns, dtype=str)
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        np.savez(f, **arrays)
+    os.replace(tmp_path, path)
+
+
+def read_dataset_cache(path):
+    with span("read_dataset_cache"), np.load(path) as arrays:
+        columns = {column: arrays[column] for column in (TARGET,) + CATEGORY_COLUMNS}
+        flags = np.unpackbits(arrays['flags'], axis=1, count=len(FLAG_COLUMNS))
+        columns.update(zip(FLAG_COLUMNS, flags.T))
+        return pd.DataFrame(columns)[list(arrays['columns'])]
+
+
+def load_games(data_file):
+    if cache_is_fresh(data_file):
+        return read_dataset_cache(cache_path(data_file))
+    games = parse_csv(data_file)
+    write_dataset_cache(games, cache_path(data_file))
+    return games
@@ -0,0 +1,158 @@
+import argparse
+import json
+import os
+import pickle
+import time
+
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+
+import artifact_cache
+from model import DATA_FILE, load_model, model_key
+
+
+FLAT_DIR = "flat_forest"
+ARRAY_NAMES = ('roots', 'feature', 'threshold', 'left', 'right', 'value')
+# Largest (trees x rows) node-index matrix walked per step.
+MAX_BATCH_CELLS = 1 << 22
+
+
+def smallest_int_dtype(max_value):
+    for dtype in (np.int8, np.int16, np.int32):
+        if max_value <= np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+def floor_float32(values):
+    # Inputs are compared as float32 (as sklearn does), so rounding each threshold down to the nearest float32
+    # keeps every x <= threshold decision identical to the float64 original.
+    rounded = values.astype(np.float32)
+    too_high = rounded.astype(np.float64) > values
+    rounded[too_high] = np.nextafter(rounded[too_high], np.float32(-np.inf))
+    return rounded
+
+
+class FlatForest:
+    def __init__(self, roots, feature, threshold, left, right, value, max_depth):
+        self.roots = roots
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.max_depth = max_depth
+
+    @classmethod
+    def from_sklearn(cls, forest):
+        if not isinstance(forest, RandomForestRegressor):
+            raise ValueError(f"Only random forests can be flattened, not {type(forest).__name__}")
+        trees = [estimator.tree_ for estimator in forest.estimators_]
+        node_counts = np.array([tree.node_count for tree in trees])
+        offsets = np.concatenate([[0], np.cumsum(node_counts)[:-1]])
+        index_dtype = smallest_int_dtype(int(node_counts.sum()))
+
+        feature, threshold, left, right, value = [], [], [], [], []
+        for tree, offset in zip(trees, offsets):
+            nodes = np.arange(tree.node_count)
+            is_leaf = tree.children_left == -1
+            # Leaves point back at themselves, so every row can take the same number of steps.
+            left.append(np.where(is_leaf, nodes, tree.children_left) + offset)
+            right.append(np.where(is_leaf, nodes, tree.children_right) + offset)
+            feature.append(np.where(is_leaf, 0, tree.feature))
+            threshold.append(tree.threshold)
+            value.append(tree.value[:, 0, 0])
+
+        return cls(roots=offsets.astype(index_dtype),
+                   feature=np.concatenate(feature).astype(smallest_int_dtype(forest.n_features_in_)),
+                   threshold=floor_float32(np.concatenate(threshold)),
+                   left=np.concatenate(left).astype(index_dtype),
+                   right=np.concatenate(right).astype(index_dtype),
+                   value=np.concatenate(value).astype(np.float32),
+                   max_depth=max(tree.max_depth for tree in trees))
+
+    def predict(self, X):
+        X = np.asarray(X, dtype=np.float32)
+        chunk_rows = max(1, MAX_BATCH_CELLS // len(self.roots))
+        predictions = np.empty(len(X))
+        for start in range(0, len(X), chunk_rows):
+            predictions[start:start + chunk_rows] = self.predict_chunk(X[start:start + chunk_rows])
+        return predictions
+
+    def predict_chunk(self, X):
+        rows = np.arange(len(X))
+        nodes = np.repeat(self.roots[:, None], len(X), axis=1)
+        for _ in range(self.max_depth):
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        return self.value[nodes].mean(axis=0, dtype=np.float64)
+
+    @property
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in ARRAY_NAMES)
+
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        for name in ARRAY_NAMES:
+            np.save(os.path.join(directory, name + ".npy"), getattr(self, name))
+        with open(os.path.join(directory, "meta.json"), 'w') as f:
+            json.dump({'max_depth': self.max_depth}, f)
+
+    @classmethod
+    def load(cls, directory):
+        with open(os.path.join(directory, "meta.json")) as f:
+            meta = json.load(f)
+        arrays = {name: np.load(os.path.join(directory, name + ".npy"), mmap_mode='r') for name in ARRAY_NAMES}
+        return cls(max_depth=meta['max_depth'], **arrays)
+
+
+def flat_forest_dir(key):
+    return os.path.join(artifact_cache.CACHE_DIR, key, FLAT_DIR)
+
+
+def load_flat_forest(data_file=DATA_FILE):
+    directory = flat_forest_dir(model_key(data_file))
+    if not os.path.exists(os.path.join(directory, "meta.json")):
+        flat = FlatForest.from_sklearn(load_model(data_file)['model'])
+        flat.save(directory)
+    return FlatForest.load(directory)
+
+
+def time_per_call(predict, X, repeats):
+    started = time.perf_counter()
+    for i in range(repeats):
+        row = i % len(X)
+        predict(X[row:row + 1])
+    return (time.perf_counter() - started) / repeats
+
+
+def benchmark(data_file=DATA_FILE, repeats=200):
+    artifact = load_model(data_file)
+    forest = artifact['model']
+    flat = load_flat_forest(data_file)
+    X_test = artifact['X_test']
+
+    difference = np.abs(forest.predict(X_test) - flat.predict(X_test)).max()
+    return {'max_abs_difference': float(difference),
+            'sklearn_single_row_ms': time_per_call(forest.predict, X_test, repeats) * 1000,
+            'flat_single_row_ms': time_per_call(flat.predict, X_test.to_numpy(), repeats) * 1000,
+            'sklearn_pickle_bytes': len(pickle.dumps(forest)),
+            'flat_bytes': flat.nbytes}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export the forest to flat arrays and compare it with sklearn.")
+    parser.add_argument("--data-file", default=DATA_FILE, help="training CSV the cached model was built from")
+    parser.add_argument("--repeats", type=int, default=200, help="single-row predictions timed per engine")
+    args = parser.parse_args(argv)
+
+    results = benchmark(args.data_file, args.repeats)
+    print(f"max |sklearn - flat| over the test split: {results['max_abs_difference']:.2e}")
+    print(f"single-row latency: sklearn {results['sklearn_single_row_ms']:.3f} ms, "
+          f"flat {results['flat_single_row_ms']:.3f} ms")
+    print(f"model size: sklearn pickle {results['sklearn_pickle_bytes'] / 1e6:.2f} MB, "
+          f"flat arrays {results['flat_bytes'] / 1e6:.2f} MB")
+
+
+if __name__ == "__main__":
+    main()
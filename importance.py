@@ -0,0 +1,93 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from scipy import stats
+
+import artifact_cache
+from instrumentation import instrument
+from model import DATA_FILE, load_model, model_key
+
+
+ARTIFACT_NAME = "importance"
+N_REPEATS = 30
+CONFIDENCE = 0.95
+SEED = 42
+# Larger test splits are subsampled; the importance ranking settles long before this many rows.
+MAX_SAMPLES = 5000
+
+
+def r2_rows(y, predictions):
+    # R^2 of every row of a (repeats x samples) prediction matrix against the same target.
+    return 1 - ((predictions - y) ** 2).sum(axis=1) / ((y - y.mean()) ** 2).sum()
+
+
+def column_drops(estimator, X, y, baseline, column, n_repeats):
+    # All repeats for one column are stacked into a single predict call. The seed depends only on the column, so
+    # the result does not depend on which thread ran it.
+    rng = np.random.default_rng(SEED + column)
+    stacked = pd.concat([X] * n_repeats, ignore_index=True)
+    values = X.iloc[:, column].to_numpy()
+    stacked.iloc[:, column] = np.concatenate([rng.permutation(values) for _ in range(n_repeats)])
+    predictions = estimator.predict(stacked).reshape(n_repeats, len(X))
+    return baseline - r2_rows(y, predictions)
+
+
+@instrument("permutation_importance")
+def compute_importance(artifact, n_repeats=N_REPEATS, confidence=CONFIDENCE, n_jobs=-1):
+    estimator, X = artifact['model'], artifact['X_test']
+    y = np.asarray(artifact['y_test'], dtype=np.float64).ravel()
+    y_pred = np.asarray(artifact['y_pred'])
+    if len(X) > MAX_SAMPLES:
+        rows = np.sort(np.random.default_rng(SEED).choice(len(X), MAX_SAMPLES, replace=False))
+        X, y, y_pred = X.iloc[rows], y[rows], y_pred[rows]
+    baseline = r2_rows(y, y_pred[np.newaxis, :])[0]
+
+    drops = Parallel(n_jobs=n_jobs, prefer='threads')(
+        delayed(column_drops)(estimator, X, y, baseline, column, n_repeats) for column in range(X.shape[1]))
+    drops = np.array(drops)
+
+    mean = drops.mean(axis=1)
+    std = drops.std(axis=1, ddof=1)
+    margin = stats.t.ppf((1 + confidence) / 2, n_repeats - 1) * std / np.sqrt(n_repeats)
+    return pd.DataFrame({'importance': mean, 'std': std, 'ci_low': mean - margin, 'ci_high': mean + margin},
+                        index=pd.Index(X.columns, name='feature'))
+
+
+def with_shares(table):
+    # Shares are the mean drops normalised to 100%, in the same spirit as impurity importances. A feature cannot
+    # account for less than none of the variability, so the drops and both interval bounds are clipped at zero.
+    clipped = table[['importance', 'ci_low', 'ci_high']].clip(lower=0)
+    total = clipped['importance'].sum()
+    scale = 100 / total if total > 0 else 0
+    return table.assign(share=clipped['importance'] * scale, share_ci_low=clipped['ci_low'] * scale,
+                        share_ci_high=clipped['ci_high'] * scale)
+
+
+def load_importance(key, artifact, n_repeats=N_REPEATS, confidence=CONFIDENCE):
+    cached = artifact_cache.load_artifact(key, ARTIFACT_NAME, mmap=False)
+    if cached is not None and cached['n_repeats'] == n_repeats and cached['confidence'] == confidence:
+        return with_shares(cached['table'])
+    table = compute_importance(artifact, n_repeats, confidence)
+    artifact_cache.save_artifact(key, ARTIFACT_NAME, {'n_repeats': n_repeats, 'confidence': confidence,
+                                                      'table': table})
+    return with_shares(table)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Recompute the cached permutation importances for the current model.")
+    parser.add_argument("--data-file", default=DATA_FILE)
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    table = compute_importance(load_model(args.data_file))
+    path = artifact_cache.save_artifact(model_key(args.data_file), ARTIFACT_NAME,
+                                        {'n_repeats': N_REPEATS, 'confidence': CONFIDENCE, 'table': table})
+    print(f"Permutation importances for {len(table)} features written to {path} in "
+          f"{time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+import artifact_cache
+import importance
+import kpis
+import partial_dependence
+from dataset_cache import cache_path, write_dataset_cache
+from model import DATA_FILE, SPLIT_PARAMS, TRAIN_OPTIONS, grow_forest, load_model, model_config, model_key
+from schema import CSV_DTYPES, TARGET, encode_categories
+from slice_models import all_slices, slice_name
+
+
+NEW_TREES = 100
+RECENT_ROWS = 200
+
+
+def append_to_csv(new_games, data_file):
+    needs_newline = False
+    with open(data_file, 'rb') as f:
+        if f.seek(0, os.SEEK_END) > 0:
+            f.seek(-1, os.SEEK_END)
+            needs_newline = f.read(1) != b'\n'
+    with open(data_file, 'a', newline='') as f:
+        if needs_newline:
+            f.write('\n')
+        new_games.to_csv(f, header=False, index=False)
+
+
+def tree_prediction_sum(trees, X):
+    X = X.to_numpy(dtype=np.float32)
+    total = np.zeros(len(X))
+    for tree in trees:
+        total += tree.predict(X)
+    return total
+
+
+def scaled_target(scaler, games):
+    return pd.DataFrame(scaler.transform(games[[TARGET]]), index=games.index, columns=[TARGET])
+
+
+def split_new_rows(encoded, generation):
+    rng = np.random.default_rng(SPLIT_PARAMS['random_state'] + generation)
+    order = rng.permutation(len(encoded))
+    n_test = int(len(encoded) * SPLIT_PARAMS['test_size'])
+    return encoded.iloc[np.sort(order[n_test:])], encoded.iloc[np.sort(order[:n_test])]
+
+
+def carry_over(old_key, new_key, name, generation):
+    entry = artifact_cache.load_artifact(old_key, name, mmap=False)
+    if entry is None:
+        return
+    entry = dict(entry, computed_generation=entry.get('computed_generation', generation))
+    artifact_cache.save_artifact(new_key, name, entry)
+
+
+def ingest_games(new_games, data_file=DATA_FILE, new_trees=NEW_TREES, max_trees=None, recent_rows=RECENT_ROWS,
+                 progress=None):
+    engine, params = model_config()
+    if engine != 'forest':
+        raise ValueError(f"Incremental ingestion needs the forest engine, but {engine!r} is configured")
+    max_trees = params['n_estimators'] if max_trees is None else max_trees
+    if new_trees > max_trees:
+        raise ValueError("new_trees cannot be larger than max_trees")
+
+    old_key = model_key(data_file)
+    load_model(data_file)
+    artifact = artifact_cache.load_artifact(old_key, "model", mmap=False)
+    data, rfm, scaler = artifact['data'], artifact['model'], artifact['scaler']
+    generation = artifact.get('generation', 0) + 1
+
+    encoded = encode_categories(new_games[list(data.columns)]).astype(data.dtypes.to_dict())
+    encoded.index = pd.RangeIndex(len(data), len(data) + len(encoded))
+    new_train, new_test = split_new_rows(encoded, generation)
+
+    # Update the target scaler with the new training rows, then move every existing scaled value (tree leaves,
+    # stored targets and predictions) onto the new scale. The mapping is affine, so it commutes with tree averaging.
+    old_mean, old_scale = scaler.mean_[0], scaler.scale_[0]
+    scaler.partial_fit(new_train[[TARGET]])
+
+    def rescale(values):
+        return (values * old_scale + old_mean - scaler.mean_[0]) / scaler.scale_[0]
+
+    for tree in rfm.estimators_:
+        tree.tree_.value[:] = rescale(tree.tree_.value)
+    y_train = pd.concat([rescale(artifact['y_train']), scaled_target(scaler, new_train)])
+    y_test = pd.concat([rescale(artifact['y_test']), scaled_target(scaler, new_test)])
+    X_train = pd.concat([artifact['X_train'], new_train.drop(TARGET, axis=1)])
+    X_test_old = artifact['X_test']
+    X_test = pd.concat([X_test_old, new_test.drop(TARGET, axis=1)])
+
+    # New trees only see the most recent training rows; a fresh seed per generation keeps them distinct from
+    # trees grown at the same positions in earlier generations.
+    recent = X_train.sort_index().index[-max(recent_rows, len(new_train)):]
+    n_before = len(rfm.estimators_)
+    rfm.set_params(random_state=params['random_state'] + generation)
+    grow_forest(rfm, X_train.loc[recent], y_train.loc[recent, TARGET].to_numpy(), n_before + new_trees,
+                TRAIN_OPTIONS['n_jobs'], TRAIN_OPTIONS['backend'], TRAIN_OPTIONS['batch_size'], progress)
+    added = rfm.estimators_[n_before:]
+
+    retire = max(0, len(rfm.estimators_) - max_trees)
+    retired = rfm.estimators_[:retire]
+    rfm.estimators_ = rfm.estimators_[retire:]
+    rfm.set_params(n_estimators=len(rfm.estimators_))
+
+    # Only the added and retired trees are evaluated on the existing test rows; new test rows use the whole forest.
+    prediction_sum = rescale(np.asarray(artifact['y_pred'])) * n_before
+    prediction_sum += tree_prediction_sum(added, X_test_old) - tree_prediction_sum(retired, X_test_old)
+    y_pred = prediction_sum / len(rfm.estimators_)
+    if len(new_test):
+        y_pred = np.concatenate([y_pred, rfm.predict(new_test.drop(TARGET, axis=1))])
+
+    combined = pd.concat([data, encoded])
+    append_to_csv(new_games[list(data.columns)], data_file)
+    write_dataset_cache(combined, cache_path(data_file))
+
+    new_key = model_key(data_file)
+    affected = {('genre', code) for code in encoded['Genre']} | {('theme', code) for code in encoded['Theme']}
+    for kind, code in all_slices():
+        if (kind, code) not in affected:
+            artifact_cache.copy_artifact(old_key, new_key, slice_name(kind, code))
+
+    new_artifact = {'data': combined, 'model': rfm, 'scaler': scaler, 'X_train': X_train, 'X_test': X_test,
+                    'y_train': y_train, 'y_test': y_test, 'y_pred': y_pred, 'generation': generation}
+    artifact_cache.save_artifact(new_key, "model", new_artifact)
+    # The stored test predictions are already up to date, so the KPI bundle is rebuilt here instead of on next launch.
+    artifact_cache.save_artifact(new_key, kpis.ARTIFACT_NAME, kpis.compute_kpis(new_artifact))
+    # Importances and partial dependence need the new forest run over every setting again, so the previous tables are
+    # carried over, tagged with the generation they were computed for, until their scripts are re-run.
+    for name in (importance.ARTIFACT_NAME, partial_dependence.ARTIFACT_NAME):
+        carry_over(old_key, new_key, name, generation - 1)
+    return new_artifact
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Append new games to the dataset and update the model in place.")
+    parser.add_argument("input", help="CSV of new games with the same columns as the training data")
+    parser.add_argument("--data-file", default=DATA_FILE, help="training CSV to append to")
+    parser.add_argument("--new-trees", type=int, default=NEW_TREES, help="trees grown on the recent data")
+    parser.add_argument("--max-trees", type=int, default=None,
+                        help="forest size to keep; the oldest trees are retired beyond it")
+    parser.add_argument("--recent-rows", type=int, default=RECENT_ROWS,
+                        help="most recent training rows the new trees are fitted on")
+    args = parser.parse_args(argv)
+
+    new_games = pd.read_csv(args.input, dtype=dict(CSV_DTYPES))
+    artifact = ingest_games(new_games, args.data_file, args.new_trees, args.max_trees, args.recent_rows,
+                            progress=lambda done, total: print(f"Grew {done} of {total} trees", file=sys.stderr))
+    print(f"Ingested {len(new_games)} games; the dataset now has {len(artifact['data'])} rows and the forest "
+          f"{len(artifact['model'].estimators_)} trees.")
+    key = model_key(args.data_file)
+    for module in (importance, partial_dependence):
+        entry = artifact_cache.load_artifact(key, module.ARTIFACT_NAME, mmap=False)
+        if entry is not None and 'computed_generation' in entry:
+            print(f"{module.ARTIFACT_NAME} was carried over from generation {entry['computed_generation']}; run "
+                  f"python {module.__name__}.py to refresh it.")
+
+
+if __name__ == "__main__":
+    main()
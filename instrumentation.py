@@ -0,0 +1,147 @@
+import atexit
+import cProfile
+import functools
+import json
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+
+# CAPSTONE_INSTRUMENT=1 records per-stage timings, call counts and memory deltas. CAPSTONE_PROFILE takes a
+# comma-separated list of stage names (or "all") to run under cProfile, and CAPSTONE_TRACE / CAPSTONE_CHROME_TRACE
+# name files to write the JSON summary and Chrome trace to when the process exits.
+enabled = os.environ.get('CAPSTONE_INSTRUMENT', '') not in ('', '0')
+profiled_stages = {name for name in os.environ.get('CAPSTONE_PROFILE', '').split(',') if name}
+PROFILE_DIR = "profiles"
+
+stats = {}
+events = []
+profiles = {}
+stats_lock = threading.RLock()
+# Only one cProfile profiler can be active in the process, so a span that starts while another profiled span is
+# running (nested, or on another thread) is timed but not profiled.
+profiler_lock = threading.Lock()
+started_at = time.perf_counter()
+
+
+def enable(profile=()):
+    global enabled
+    enabled = True
+    profiled_stages.update(profile)
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def disable():
+    global enabled
+    enabled = False
+    profiled_stages.clear()
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def reset():
+    with stats_lock:
+        stats.clear()
+        events.clear()
+        profiles.clear()
+
+
+def record(stage, start, seconds, memory_delta):
+    with stats_lock:
+        stage_stats = stats.setdefault(stage, {'calls': 0, 'total_seconds': 0.0, 'max_seconds': 0.0,
+                                               'memory_delta_bytes': 0})
+        stage_stats['calls'] += 1
+        stage_stats['total_seconds'] += seconds
+        stage_stats['max_seconds'] = max(stage_stats['max_seconds'], seconds)
+        stage_stats['memory_delta_bytes'] += memory_delta
+        events.append({'name': stage, 'start': start - started_at, 'seconds': seconds,
+                       'thread': threading.get_ident(), 'memory_delta_bytes': memory_delta})
+
+
+def traced_memory():
+    return tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else 0
+
+
+@contextmanager
+def span(stage):
+    if not enabled:
+        yield
+        return
+
+    profiler = None
+    if (stage in profiled_stages or 'all' in profiled_stages) and profiler_lock.acquire(blocking=False):
+        profiler = cProfile.Profile()
+    memory_before = traced_memory()
+    start = time.perf_counter()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler_lock.release()
+            save_profile(stage, profiler)
+        record(stage, start, time.perf_counter() - start, traced_memory() - memory_before)
+
+
+def save_profile(stage, profiler):
+    # Every call of a stage is added to one set of stats, so its .prof file covers all calls, not just the last.
+    with stats_lock:
+        if stage in profiles:
+            profiles[stage].add(profiler)
+        else:
+            profiles[stage] = pstats.Stats(profiler)
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        profiles[stage].dump_stats(os.path.join(PROFILE_DIR, f"{stage}.prof"))
+
+
+def instrument(stage):
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return func(*args, **kwargs)
+            with span(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def summary():
+    with stats_lock:
+        return {stage: dict(stage_stats, mean_seconds=stage_stats['total_seconds'] / stage_stats['calls'])
+                for stage, stage_stats in stats.items()}
+
+
+def export_json(path):
+    with stats_lock:
+        trace = {'stages': summary(), 'events': list(events)}
+    with open(path, 'w') as f:
+        json.dump(trace, f, indent=2)
+
+
+def export_chrome_trace(path):
+    # Loadable in chrome://tracing or Perfetto; timestamps and durations are in microseconds.
+    with stats_lock:
+        trace_events = [{'name': event['name'], 'ph': 'X', 'pid': os.getpid(), 'tid': event['thread'],
+                         'ts': event['start'] * 1e6, 'dur': event['seconds'] * 1e6,
+                         'args': {'memory_delta_bytes': event['memory_delta_bytes']}} for event in events]
+    with open(path, 'w') as f:
+        json.dump({'traceEvents': trace_events, 'displayTimeUnit': 'ms'}, f)
+
+
+def export_on_exit():
+    if os.environ.get('CAPSTONE_TRACE'):
+        export_json(os.environ['CAPSTONE_TRACE'])
+    if os.environ.get('CAPSTONE_CHROME_TRACE'):
+        export_chrome_trace(os.environ['CAPSTONE_CHROME_TRACE'])
+
+
+if enabled:
+    tracemalloc.start()
+    atexit.register(export_on_exit)
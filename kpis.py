@@ -0,0 +1,83 @@
+import numpy as np
+from joblib import Parallel, delayed
+
+import artifact_cache
+from instrumentation import instrument
+
+
+ARTIFACT_NAME = "kpis"
+N_BOOTSTRAP = 2000
+CONFIDENCE = 0.95
+SEED = 42
+# Largest (resamples x rows) index matrix drawn at once.
+MAX_BOOTSTRAP_CELLS = 1 << 22
+
+
+def moments(y, residuals):
+    return np.column_stack([y, y ** 2, residuals, residuals ** 2])
+
+
+def scores(means):
+    # Every KPI follows from the means of y, y^2, r and r^2, so a resample reduces to one weighted sum.
+    y_mean, y_sq, r_mean, r_sq = np.moveaxis(means, -1, 0)
+    y_var = y_sq - y_mean ** 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return {'mse': r_sq, 'r2': 1 - r_sq / y_var, 'explained_variance': 1 - (r_sq - r_mean ** 2) / y_var}
+
+
+def bootstrap_chunk(values, n_resamples, seed):
+    rng = np.random.default_rng(seed)
+    per_draw = max(1, MAX_BOOTSTRAP_CELLS // len(values))
+    draws = []
+    for start in range(0, n_resamples, per_draw):
+        n_draws = min(per_draw, n_resamples - start)
+        rows = rng.integers(0, len(values), (n_draws, len(values)))
+        # Each resample becomes a row of per-sample counts, so the means for the whole chunk are one matrix product.
+        rows += np.arange(n_draws)[:, np.newaxis] * len(values)
+        counts = np.bincount(rows.ravel(), minlength=rows.size).reshape(n_draws, len(values))
+        draws.append(scores(counts @ values / len(values)))
+    return {name: np.concatenate([draw[name] for draw in draws]) for name in draws[0]}
+
+
+def bootstrap(values, n_bootstrap=N_BOOTSTRAP, confidence=CONFIDENCE, n_jobs=-1):
+    n_chunks = min(n_bootstrap, 8)
+    sizes = [len(part) for part in np.array_split(np.arange(n_bootstrap), n_chunks)]
+    seeds = np.random.SeedSequence(SEED).spawn(n_chunks)
+    chunks = Parallel(n_jobs=n_jobs, prefer='threads')(
+        delayed(bootstrap_chunk)(values, size, seed) for size, seed in zip(sizes, seeds))
+
+    tail = (1 - confidence) / 2 * 100
+    intervals = {}
+    for name in chunks[0]:
+        draws = np.concatenate([chunk[name] for chunk in chunks])
+        intervals[name] = tuple(float(bound) for bound in np.nanpercentile(draws, [tail, 100 - tail]))
+    return intervals
+
+
+@instrument("compute_kpis")
+def compute_kpis(artifact, n_bootstrap=N_BOOTSTRAP, confidence=CONFIDENCE):
+    y = np.asarray(artifact['y_test'], dtype=np.float64).ravel()
+    y_pred = np.asarray(artifact['y_pred'], dtype=np.float64)
+    residuals = y - y_pred
+    values = moments(y, residuals)
+
+    # The point estimates use the exact formulas; the moment form is only used for the resamples.
+    kpis = {'mse': float((residuals ** 2).mean()), 'r2': float(1 - (residuals ** 2).mean() / y.var()),
+            'explained_variance': float(1 - residuals.var() / y.var())}
+    # The range of the scaled target, always counting zero as part of it.
+    kpis['variance'] = float(max(0, y.max()) - min(0, y.min()))
+    kpis['residuals'] = residuals
+    kpis['y_pred'] = y_pred
+    kpis['ci'] = bootstrap(values, n_bootstrap, confidence)
+    kpis['n_bootstrap'] = n_bootstrap
+    kpis['confidence'] = confidence
+    return kpis
+
+
+def load_kpis(key, artifact, n_bootstrap=N_BOOTSTRAP, confidence=CONFIDENCE):
+    cached = artifact_cache.load_artifact(key, ARTIFACT_NAME, mmap=False)
+    if cached is not None and cached['n_bootstrap'] == n_bootstrap and cached['confidence'] == confidence:
+        return cached
+    kpis = compute_kpis(artifact, n_bootstrap, confidence)
+    artifact_cache.save_artifact(key, ARTIFACT_NAME, kpis)
+    return kpis
@@ -0,0 +1,83 @@
+import argparse
+import asyncio
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from model import DATA_FILE
+from serve import HOST, PORT
+
+
+async def post(reader, writer, host, body):
+    writer.write((f"POST /predict HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+                  f"Content-Length: {len(body)}\r\n\r\n").encode('latin-1') + body)
+    await writer.drain()
+    status_line = await reader.readline()
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.strip().lower() == 'content-length':
+            length = int(value)
+    await reader.readexactly(length)
+    return int(status_line.split()[1])
+
+
+async def client(host, port, bodies, latencies, errors):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for body in bodies:
+            started = time.perf_counter()
+            status = await post(reader, writer, host, body)
+            latencies.append(time.perf_counter() - started)
+            if status != 200:
+                errors.append(status)
+    finally:
+        writer.close()
+
+
+async def run_load_test(host, port, requests, concurrency, rows_per_request, data_file):
+    games = pd.read_csv(data_file).drop('Copies_per_year', axis=1)
+    rng = np.random.default_rng(42)
+    bodies = []
+    for _ in range(requests):
+        sample = games.iloc[rng.integers(0, len(games), rows_per_request)]
+        bodies.append(json.dumps({'rows': sample.to_dict(orient='records')}).encode())
+
+    latencies, errors = [], []
+    started = time.perf_counter()
+    await asyncio.gather(*(client(host, port, bodies[i::concurrency], latencies, errors)
+                           for i in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies_ms = np.array(latencies) * 1000
+    return {'requests': len(latencies), 'errors': len(errors), 'concurrency': concurrency,
+            'rows_per_request': rows_per_request, 'seconds': elapsed,
+            'requests_per_second': len(latencies) / elapsed,
+            'p50_ms': float(np.percentile(latencies_ms, 50)), 'p99_ms': float(np.percentile(latencies_ms, 99))}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure latency and throughput of the prediction server.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--rows", type=int, default=1, help="feature rows sent in each request")
+    parser.add_argument("--data-file", default=DATA_FILE, help="CSV to sample request rows from")
+    args = parser.parse_args(argv)
+
+    results = asyncio.run(run_load_test(args.host, args.port, args.requests, args.concurrency, args.rows,
+                                        args.data_file))
+    print(f"{results['requests']} requests ({results['errors']} errors) in {results['seconds']:.2f}s "
+          f"with {results['concurrency']} concurrent clients")
+    print(f"throughput: {results['requests_per_second']:.1f} requests/s")
+    print(f"latency: p50 {results['p50_ms']:.2f} ms, p99 {results['p99_ms']:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,30 @@
+import importlib.util
+import queue
 import subprocess
-import importlib
-import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
+import sys
+import threading
 import tkinter as tk
 
 from tkinter import ttk
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from matplotlib.figure import Figure
 
-import data_getters
+from instrumentation import instrument
 
 
-data_getters.initialize_model()
+# Module name -> pip package. Only looked up with find_spec, so the check costs a few milliseconds and never imports.
+REQUIRED_PACKAGES = {'numpy': 'numpy', 'matplotlib': 'matplotlib', 'seaborn': 'seaborn', 'pandas': 'pandas',
+                     'sklearn': 'scikit-learn', 'joblib': 'joblib'}
+
 
 def install_libraries():
-    packages = ['numpy', 'matplotlib', 'seaborn', 'tkinter', 'pandas', 'sklearn', 'os']
-    for lib in packages:
-        try:
-            importlib.import_module(lib)
-        except ImportError:
-            subprocess.run(['pip', 'install', lib])
+    missing = [package for module, package in REQUIRED_PACKAGES.items() if importlib.util.find_spec(module) is None]
+    if missing:
+        subprocess.run([sys.executable, '-m', 'pip', 'install', *missing])
+
+
+def load_model(progress):
+    import data_getters
+    data_getters.initialize_model(progress=progress)
+
 
 class MainWindow(tk.Tk):
     def __init__(self, *args, **kwargs):
@@ -36,19 +40,72 @@ class MainWindow(tk.Tk):
         container = tk.Frame(self)
         container.pack(side="top", fill="both", expand=True)
 
+        # Pages are built the first time they are shown, so startup only pays for HomePage.
+        self.container = container
+        self.pages = {F.__name__: F for F in (HomePage, IntroPage, ImportanceBreakdown, GenreBreakdown,
+                                              ThemeBreakdown, WhatIfExplorer, KpiMetrics)}
         self.frames = {}
-        for F in (HomePage, IntroPage, ImportanceBreakdown, GenreBreakdown, ThemeBreakdown, KpiMetrics):
-            page_name = F.__name__
-            frame = F(parent=container, controller=self, close_app_callback=self.close_application)
-            self.frames[page_name] = frame
-            frame.pack(fill="both", expand=True)
-
+        self.model_loaded = False
+        self.model_error = None
         self.show_frame("HomePage")
 
+        # Worker threads never touch Tk; they post callbacks here and poll_results runs them on the Tk thread.
+        self.results = queue.Queue()
+        self.after(50, self.poll_results)
+        self.run_in_background(lambda: load_model(self.report_progress), self.on_model_ready, self.on_model_failed)
+
+    def run_in_background(self, work, on_done, on_error=None):
+        def report(error):
+            if on_error is not None:
+                on_error(error)
+            self.report_callback_exception(type(error), error, error.__traceback__)
+
+        def worker():
+            try:
+                result = work()
+            except Exception as error:
+                self.results.put(lambda error=error: report(error))
+                return
+            self.results.put(lambda: on_done(result))
+
+        threading.Thread(target=worker, daemon=True).start()
+
+    def poll_results(self):
+        while not self.results.empty():
+            self.results.get()()
+        self.after(50, self.poll_results)
+
+    def report_progress(self, done, total):
+        self.results.put(lambda: self.frames["HomePage"].show_progress(done, total))
+
+    def on_model_ready(self, result):
+        self.model_loaded = True
+        for frame in self.frames.values():
+            if hasattr(frame, "on_model_ready"):
+                frame.on_model_ready()
+
+    def on_model_failed(self, error):
+        self.model_error = error
+        for frame in self.frames.values():
+            if hasattr(frame, "on_model_failed"):
+                frame.on_model_failed(error)
+
     def close_application(self):
         self.destroy()
 
+    def build_frame(self, page_name):
+        frame = self.pages[page_name](parent=self.container, controller=self,
+                                      close_app_callback=self.close_application)
+        self.frames[page_name] = frame
+        if self.model_loaded and hasattr(frame, "on_model_ready"):
+            frame.on_model_ready()
+        elif self.model_error is not None and hasattr(frame, "on_model_failed"):
+            frame.on_model_failed(self.model_error)
+        return frame
+
     def show_frame(self, page_name):
+        if page_name not in self.frames:
+            self.build_frame(page_name)
         for frame_name, frame in self.frames.items():
             if frame_name == page_name:
                 frame.pack(fill="both", expand=True)
@@ -85,6 +142,9 @@ class HomePage(tk.Frame):
         theme_button = tk.Button(button_frame, text="Explore by theme", font=("Verdana", 16), width=25, height=2,
                                  bg="#D1D9E6", fg="#2E3B4E", command=lambda: controller.show_frame("ThemeBreakdown"))
         theme_button.pack(padx=20, pady=10)
+        what_if_button = tk.Button(button_frame, text="What if?", font=("Verdana", 16), width=25, height=2,
+                                   bg="#D1D9E6", fg="#2E3B4E", command=lambda: controller.show_frame("WhatIfExplorer"))
+        what_if_button.pack(padx=20, pady=10)
         metrics_button = tk.Button(button_frame, text="KPIs", font=("Verdana", 16), width=25, height=2, bg="#D1D9E6",
                                    fg="#2E3B4E", command=lambda: controller.show_frame("KpiMetrics"))
         metrics_button.pack(padx=20, pady=10)
@@ -96,6 +156,31 @@ class HomePage(tk.Frame):
                                    fg="#2E3B4E", command=self.close_app_callback)
         close_button.pack(padx=20, pady=20)
 
+        self.status_frame = tk.Frame(self, bg="#2E3B4E")
+        self.status_frame.grid(row=3, column=0, pady=10)
+        self.status_label = tk.Label(self.status_frame, text="Loading model...", font=("Helvetica", 12),
+                                     bg="#2E3B4E", fg="#D1D9E6")
+        self.status_label.pack(pady=5)
+        self.progress_bar = ttk.Progressbar(self.status_frame, mode="indeterminate", length=300)
+        self.progress_bar.pack(pady=5)
+        self.progress_bar.start(10)
+
+    def show_progress(self, done, total):
+        if self.progress_bar["mode"] == "indeterminate":
+            self.progress_bar.stop()
+            self.progress_bar.configure(mode="determinate", maximum=total)
+        self.progress_bar["value"] = done
+        self.status_label.configure(text=f"Training model... {done} of {total} trees")
+
+    def on_model_ready(self):
+        self.progress_bar.stop()
+        self.status_frame.grid_forget()
+
+    def on_model_failed(self, error):
+        self.progress_bar.stop()
+        self.progress_bar.pack_forget()
+        self.status_label.configure(text=f"The model could not be loaded: {error}")
+
 
 class IntroPage(tk.Frame):
     def __init__(self, parent, controller, close_app_callback):
@@ -134,13 +219,32 @@ class ImportanceBreakdown(tk.Frame):
                          fg="#D1D9E6")
         label.pack(pady=40)
 
+        self.content_frame = tk.Frame(self, bg="#2E3B4E")
+        self.content_frame.pack(side="top", fill="both", expand=True)
+        self.loading_label = tk.Label(self.content_frame, text="The model is still loading...", font=("Helvetica", 14),
+                                      bg="#2E3B4E", fg="#D1D9E6")
+        self.loading_label.pack(pady=20)
+
+        back_button = tk.Button(self, text="Return", font=("Verdana", 16), width=25, height=2, bg="#D1D9E6",
+                                fg="#2E3B4E", command=lambda: controller.show_frame("HomePage"))
+        back_button.pack(pady=10)
+
+    def on_model_failed(self, error):
+        self.loading_label.configure(text=f"The model could not be loaded: {error}")
+
+    def on_model_ready(self):
+        import data_getters
+
+        self.loading_label.destroy()
+
         feature_import_data = data_getters.get_feature_import()
-        for title, import_percent in feature_import_data:
-            feature_label = tk.Label(self, text=f"{title} accounted for {import_percent:.2f}% of the variability in sales figures.",
+        for title, import_percent, ci_low, ci_high in feature_import_data:
+            feature_label = tk.Label(self.content_frame, text=f"{title} accounted for {import_percent:.2f}% "
+                                                              f"(95% CI {ci_low:.2f}% to {ci_high:.2f}%) of the variability in sales figures.",
                                      font=("Helvetica", 14), bg="#2E3B4E", fg="#D1D9E6")
             feature_label.pack(pady=20)
 
-        feature_frame = tk.Frame(self, bg="#2E3B4E")
+        feature_frame = tk.Frame(self.content_frame, bg="#2E3B4E")
         feature_frame.pack(side="top", fill="y", expand=True, pady=10, anchor="n")
 
         best_frame = tk.Frame(feature_frame, bg="#2E3B4E")
@@ -165,14 +269,15 @@ class ImportanceBreakdown(tk.Frame):
             worst_label = tk.Label(worst_frame, text=feature, font=("Helvetica", 12), bg="#2E3B4E", fg="#D1D9E6")
             worst_label.pack(pady=2)
 
-        back_button = tk.Button(self, text="Return", font=("Verdana", 16), width=25, height=2, bg="#D1D9E6",
-                                fg="#2E3B4E", command=lambda: controller.show_frame("HomePage"))
-        back_button.pack(pady=10)
-
 class GenreBreakdown(tk.Frame):
     def __init__(self, parent, controller, close_app_callback):
         tk.Frame.__init__(self, parent, bg="#2E3B4E")
         self.columnconfigure(0, weight=1)
+        self.controller = controller
+
+        import charts
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        from matplotlib.figure import Figure
 
         label = tk.Label(self, text="Explore by Genre", font=("Helvetica", 28), bg="#2E3B4E",
                          fg="#D1D9E6")
@@ -187,49 +292,67 @@ class GenreBreakdown(tk.Frame):
         self.selected_genre = tk.StringVar()
         genre_dropdown = ttk.Combobox(dropdown_frame, textvariable=self.selected_genre, values=genres, state="readonly")
         genre_dropdown.pack(side="left", pady=10)
-        action_button = tk.Button(dropdown_frame, text="Show Data", command=self.graph_by_genre)
-        action_button.pack(side="left", pady=10)
+        self.action_button = tk.Button(dropdown_frame, text="Show Data", command=self.graph_by_genre, state="disabled")
+        self.action_button.pack(side="left", pady=10)
 
         self.graph_frame = tk.Frame(self, bg="#2E3B4E")
         self.graph_frame.grid(row=2, column=0, columnspan=3, padx=50, pady=20)
-        self.fig, self.ax = plt.subplots(figsize=(8, 6))
+        self.fig = Figure(figsize=(8, 6))
+        self.ax = self.fig.add_subplot(111)
+        self.chart = charts.BreakdownChart(self.ax, 'Theme')
         self.fig.tight_layout(pad=6.0)
         self.canvas = FigureCanvasTkAgg(self.fig, master=self.graph_frame)
+        self.chart.enable_blitting(self.canvas)
         self.canvas.get_tk_widget().pack(side="top", fill="both", expand=True)
+        self.dependence_label = tk.Label(self.graph_frame, text="", font=("Helvetica", 12), bg="#2E3B4E",
+                                         fg="#D1D9E6", justify="left")
+        self.dependence_label.pack(side="top", pady=10)
 
         back_button = tk.Button(self, text="Return", font=("Verdana", 16), width=25, height=2, bg="#D1D9E6",
                                 fg="#2E3B4E", command=lambda: controller.show_frame("HomePage"))
         back_button.grid(row=3, column=0, columnspan=3, padx=50, pady=20, sticky="s")
 
+    def on_model_ready(self):
+        self.action_button.configure(state="normal")
+
+    @instrument("graph_by_genre")
     def graph_by_genre(self):
+        import data_getters
+
         genre = self.selected_genre.get()
-        grouped_df = data_getters.model_by_genre(genre)
+        if not genre:
+            return
+        self.action_button.configure(state="disabled")
+        self.controller.run_in_background(lambda: data_getters.model_by_genre(genre),
+                                          lambda grouped_df: self.draw_genre_graph(grouped_df, genre),
+                                          lambda error: self.show_error(error, genre))
 
-        self.ax.clear()
+    @instrument("graph_by_genre.draw")
+    def draw_genre_graph(self, grouped_df, genre):
+        import data_getters
+        from partial_dependence import summary_text
 
-        bar_width = 0.35
-        theme_indices = range(10)
-        index = np.array(theme_indices) - bar_width / 2
-        bar1 = self.ax.bar(index, grouped_df['Actual_Sales'], bar_width, label='Actual')
-        bar2 = self.ax.bar(index + bar_width, grouped_df['Predicted_Sales'], bar_width, label='Predicted')
-        themes = []
-        for i in theme_indices:
-            themes.append(data_getters.all_mapping(i))
+        self.action_button.configure(state="normal")
+        entry = data_getters.get_slice_dependence('genre', genre)
+        self.dependence_label.configure(text="" if entry is None else summary_text(entry))
 
-        self.ax.set_xlabel('Themes')
-        self.ax.set_ylabel('Sales')
-        self.ax.set_title('Actual vs Predicted Sales by Theme')
-        self.ax.set_xticks(index + bar_width / 2)
-        self.ax.set_xticklabels(themes, rotation=45, ha="right")
-        self.ax.legend()
+        self.chart.update(grouped_df, f"{genre}: Actual vs Predicted Sales by Theme")
+        self.chart.refresh()
 
-        self.canvas.draw()
+    def show_error(self, error, genre):
+        self.action_button.configure(state="normal")
+        self.dependence_label.configure(text=f"Could not load {genre}: {error}")
 
 
 class ThemeBreakdown(tk.Frame):
     def __init__(self, parent, controller, close_app_callback):
         tk.Frame.__init__(self, parent, bg="#2E3B4E")
         self.columnconfigure(0, weight=1)
+        self.controller = controller
+
+        import charts
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        from matplotlib.figure import Figure
 
         label = tk.Label(self, text="Explore by Theme", font=("Helvetica", 28), bg="#2E3B4E",
                          fg="#D1D9E6")
@@ -245,45 +368,156 @@ class ThemeBreakdown(tk.Frame):
         self.selected_theme = tk.StringVar()
         theme_dropdown = ttk.Combobox(theme_dd_frame, textvariable=self.selected_theme, values=themes, state="readonly")
         theme_dropdown.pack(side="left", pady=10)
-        action_button = tk.Button(theme_dd_frame, text="Show Data", command=self.graph_by_theme)
-        action_button.pack(side="left", pady=10)
+        self.action_button = tk.Button(theme_dd_frame, text="Show Data", command=self.graph_by_theme, state="disabled")
+        self.action_button.pack(side="left", pady=10)
 
         self.graph_frame = tk.Frame(self, bg="#2E3B4E")
         self.graph_frame.grid(row=2, column=0, columnspan=3, padx=50, pady=20)
-        self.fig, self.ax = plt.subplots(figsize=(8, 6))
+        self.fig = Figure(figsize=(8, 6))
+        self.ax = self.fig.add_subplot(111)
+        self.chart = charts.BreakdownChart(self.ax, 'Genre')
         self.fig.tight_layout(pad=6.0)
         self.canvas = FigureCanvasTkAgg(self.fig, master=self.graph_frame)
+        self.chart.enable_blitting(self.canvas)
         self.canvas.get_tk_widget().pack(side="top", fill="both", expand=True)
+        self.dependence_label = tk.Label(self.graph_frame, text="", font=("Helvetica", 12), bg="#2E3B4E",
+                                         fg="#D1D9E6", justify="left")
+        self.dependence_label.pack(side="top", pady=10)
 
         back_button = tk.Button(self, text="Return", font=("Verdana", 16), width=25, height=2, bg="#D1D9E6",
                                 fg="#2E3B4E", command=lambda: controller.show_frame("HomePage"))
         back_button.grid(row=3, column=0, columnspan=3, padx=50, pady=20, sticky="s")
 
+    def on_model_ready(self):
+        self.action_button.configure(state="normal")
+
+    @instrument("graph_by_theme")
     def graph_by_theme(self):
+        import data_getters
+
         theme = self.selected_theme.get()
-        grouped_df = data_getters.model_by_theme(theme)
+        if not theme:
+            return
+        self.action_button.configure(state="disabled")
+        self.controller.run_in_background(lambda: data_getters.model_by_theme(theme),
+                                          lambda grouped_df: self.draw_theme_graph(grouped_df, theme),
+                                          lambda error: self.show_error(error, theme))
+
+    @instrument("graph_by_theme.draw")
+    def draw_theme_graph(self, grouped_df, theme):
+        import data_getters
+        from partial_dependence import summary_text
+
+        self.action_button.configure(state="normal")
+        entry = data_getters.get_slice_dependence('theme', theme)
+        self.dependence_label.configure(text="" if entry is None else summary_text(entry))
+
+        self.chart.update(grouped_df, f"{theme}: Actual vs Predicted Sales by Genre")
+        self.chart.refresh()
+
+    def show_error(self, error, theme):
+        self.action_button.configure(state="normal")
+        self.dependence_label.configure(text=f"Could not load {theme}: {error}")
 
-        self.ax.clear()
-        if grouped_df.empty:
-            grouped_df['Actual_Sales'] = 0
 
-        bar_width = 0.35
-        genre_indices = range(11, 17)
-        index = np.array(genre_indices) - bar_width / 2
-        bar1 = self.ax.bar(index, grouped_df['Actual_Sales'], bar_width, label='Actual')
-        bar2 = self.ax.bar(index + bar_width, grouped_df['Predicted_Sales'], bar_width, label='Predicted')
-        genres = []
-        for i in genre_indices:
-            genres.append(data_getters.all_mapping(i))
+class WhatIfExplorer(tk.Frame):
+    def __init__(self, parent, controller, close_app_callback):
+        tk.Frame.__init__(self, parent, bg="#2E3B4E")
+        self.columnconfigure(0, weight=1)
+        self.controller = controller
+
+        from schema import FLAG_COLUMNS, GENRE_MAPPING, GENRE_NAMES, PRICE_MAPPING, THEME_MAPPING, THEME_NAMES
+
+        label = tk.Label(self, text="What if?", font=("Helvetica", 28), bg="#2E3B4E", fg="#D1D9E6")
+        label.grid(row=0, column=0, columnspan=3, pady=20)
+
+        form_frame = tk.Frame(self, bg="#2E3B4E")
+        form_frame.grid(row=1, column=0, padx=50, pady=10)
+
+        # The dropdowns show names, but the game is built from the CSV codes the schema expects.
+        self.genre_codes = {GENRE_NAMES[code]: label for label, code in GENRE_MAPPING.items()}
+        self.theme_codes = {THEME_NAMES[code]: label for label, code in THEME_MAPPING.items() if code in THEME_NAMES}
+        self.selected_genre = tk.StringVar(value=next(iter(self.genre_codes)))
+        self.selected_theme = tk.StringVar(value=next(iter(self.theme_codes)))
+        self.selected_price = tk.StringVar(value=next(iter(PRICE_MAPPING)))
+        for column, (text, variable, values) in enumerate((("Genre", self.selected_genre, list(self.genre_codes)),
+                                                          ("Theme", self.selected_theme, list(self.theme_codes)),
+                                                          ("Price", self.selected_price, list(PRICE_MAPPING)))):
+            dd_label = tk.Label(form_frame, text=text, font=("Helvetica", 12), bg="#2E3B4E", fg="#D1D9E6")
+            dd_label.grid(row=0, column=column, padx=10)
+            dropdown = ttk.Combobox(form_frame, textvariable=variable, values=values, state="readonly")
+            dropdown.grid(row=1, column=column, padx=10, pady=5)
+
+        flag_frame = tk.Frame(self, bg="#2E3B4E")
+        flag_frame.grid(row=2, column=0, padx=50, pady=10)
+        self.flags = {}
+        for i, flag in enumerate(FLAG_COLUMNS):
+            self.flags[flag] = tk.IntVar(value=0)
+            check = tk.Checkbutton(flag_frame, text=flag.replace("_", " "), variable=self.flags[flag],
+                                   font=("Helvetica", 11), bg="#2E3B4E", fg="#D1D9E6", selectcolor="#2E3B4E",
+                                   activebackground="#2E3B4E", activeforeground="#D1D9E6")
+            check.grid(row=i // 5, column=i % 5, sticky="w", padx=10)
+
+        action_frame = tk.Frame(self, bg="#2E3B4E")
+        action_frame.grid(row=3, column=0, pady=10)
+        self.pairs = tk.IntVar(value=0)
+        pairs_check = tk.Checkbutton(action_frame, text="Include pairs of changes", variable=self.pairs,
+                                     font=("Helvetica", 11), bg="#2E3B4E", fg="#D1D9E6", selectcolor="#2E3B4E",
+                                     activebackground="#2E3B4E", activeforeground="#D1D9E6")
+        pairs_check.pack(side="left", padx=10)
+        self.action_button = tk.Button(action_frame, text="Explore", command=self.explore, state="disabled")
+        self.action_button.pack(side="left", padx=10)
+
+        self.baseline_label = tk.Label(self, text="", font=("Helvetica", 14), bg="#2E3B4E", fg="#D1D9E6")
+        self.baseline_label.grid(row=4, column=0, pady=5)
+
+        results_frame = tk.Frame(self, bg="#2E3B4E")
+        results_frame.grid(row=5, column=0, padx=50, pady=10)
+        self.results = ttk.Treeview(results_frame, columns=("change", "copies", "uplift"), show="headings", height=12)
+        for column, heading, width in (("change", "Change", 420), ("copies", "Predicted copies/year", 180),
+                                       ("uplift", "Change in copies/year", 180)):
+            self.results.heading(column, text=heading)
+            self.results.column(column, width=width, anchor="w" if column == "change" else "e")
+        self.results.pack(side="left")
+        scrollbar = ttk.Scrollbar(results_frame, orient="vertical", command=self.results.yview)
+        scrollbar.pack(side="right", fill="y")
+        self.results.configure(yscrollcommand=scrollbar.set)
+
+        back_button = tk.Button(self, text="Return", font=("Verdana", 16), width=25, height=2, bg="#D1D9E6",
+                                fg="#2E3B4E", command=lambda: controller.show_frame("HomePage"))
+        back_button.grid(row=6, column=0, columnspan=3, padx=50, pady=20, sticky="s")
 
-        self.ax.set_xlabel('Genres')
-        self.ax.set_ylabel('Sales')
-        self.ax.set_title('Actual vs Predicted Sales by Genre')
-        self.ax.set_xticks(index + bar_width / 2)
-        self.ax.set_xticklabels(genres, rotation=45, ha="right")
-        self.ax.legend()
+    def on_model_ready(self):
+        self.action_button.configure(state="normal")
 
-        self.canvas.draw()
+    def current_game(self):
+        game = {'Genre': self.genre_codes[self.selected_genre.get()],
+                'Theme': self.theme_codes[self.selected_theme.get()], 'Price': self.selected_price.get()}
+        game.update({flag: variable.get() for flag, variable in self.flags.items()})
+        return game
+
+    @instrument("what_if_explorer")
+    def explore(self):
+        import data_getters
+
+        game, pairs = self.current_game(), bool(self.pairs.get())
+        self.action_button.configure(state="disabled")
+        self.controller.run_in_background(lambda: data_getters.what_if(game, pairs), self.show_results,
+                                          self.show_error)
+
+    def show_results(self, result):
+        import pandas as pd
+
+        self.action_button.configure(state="normal")
+        self.baseline_label.configure(text=f"Predicted sales as entered: {result['baseline']:,.0f} copies per year")
+        self.results.delete(*self.results.get_children())
+        ranked = pd.concat([result['single'], result['pairs']]).sort_values('uplift', ascending=False)
+        for change, copies, uplift in ranked.itertuples(index=False):
+            self.results.insert("", "end", values=(change, f"{copies:,.0f}", f"{uplift:+,.0f}"))
+
+    def show_error(self, error):
+        self.action_button.configure(state="normal")
+        self.baseline_label.configure(text=f"Could not explore this game: {error}")
 
 
 class KpiMetrics(tk.Frame):
@@ -294,6 +528,7 @@ class KpiMetrics(tk.Frame):
         page_canvas = tk.Canvas(self, bg="#2E3B4E", borderwidth=0)
         page_canvas.pack(side="left", fill="both", expand=True)
         page_frame = tk.Frame(page_canvas, bg="#2E3B4E")
+        self.page_frame = page_frame
 
         screen_width = self.winfo_screenwidth()
         window_width = (screen_width - 10)
@@ -309,22 +544,54 @@ class KpiMetrics(tk.Frame):
                          fg="#D1D9E6")
         label.grid(row=0, column=0, columnspan=3, pady=50)
 
-        mse = data_getters.get_mse()
-        r2 = data_getters.get_r2()
-        ev = data_getters.get_explained_var()
-        residuals = data_getters.get_residuals()
-        y_pred = data_getters.get_y_pred()
-        var = data_getters.get_variance()
+        self.loading_label = tk.Label(page_frame, text="The model is still loading...", font=("Helvetica", 14),
+                                      bg="#2E3B4E", fg="#D1D9E6")
+        self.loading_label.grid(row=1, column=0, columnspan=3, pady=20)
+
+        back_frame = tk.Frame(page_frame, bg="#2E3B4E")
+        back_frame.grid(row=3, column=0, columnspan=3, pady=20)
+        back_button = tk.Button(back_frame, text="Return", font=("Verdana", 16), width=25, height=2, bg="#D1D9E6",
+                                fg="#2E3B4E", command=lambda: controller.show_frame("HomePage"))
+        back_button.pack(side="top", fill="both", expand=True, pady=10)
+
+        page_frame.update_idletasks()
+
+        def on_frame_configure(event):
+            page_canvas.configure(scrollregion=page_canvas.bbox("all"))
+
+        def on_mousewheel(event):
+            page_canvas.yview_scroll(int(-1 * (event.delta / 120)), "units")
+
+        page_frame.bind("<Configure>", on_frame_configure)
+        page_canvas.bind("<MouseWheel>", on_mousewheel)
+
+    def on_model_failed(self, error):
+        self.loading_label.configure(text=f"The model could not be loaded: {error}")
+
+    def on_model_ready(self):
+        import charts
+        import data_getters
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        from matplotlib.figure import Figure
+
+        self.loading_label.destroy()
+
+        kpis = data_getters.get_kpis()
+        mse, r2, ev = kpis['mse'], kpis['r2'], kpis['explained_variance']
+        residuals, y_pred, var = kpis['residuals'], kpis['y_pred'], kpis['variance']
         ratio = (mse / var) * 100
+        ci_text = f"{kpis['confidence']:.0%} bootstrap CI"
 
-        kpi_frame = tk.Frame(page_frame, bg="#2E3B4E")
+        kpi_frame = tk.Frame(self.page_frame, bg="#2E3B4E")
         kpi_frame.grid(row=1, column=0, columnspan=3, pady=20)
 
         ev_frame = tk.Frame(kpi_frame, bg="#2E3B4E")
         ev_frame.pack(side="left", anchor="n", expand=True, fill="both", pady=10, padx=10)
         ev_title = tk.Label(ev_frame, text="Explained Variance", font=("Helvetica", 16), bg="#2E3B4E", fg="#D1D9E6")
         ev_title.pack(pady=10)
-        ev_label = tk.Label(ev_frame, text=f"The Explained Variance value for this model is \n{ev:.4f}.",
+        ev_low, ev_high = kpis['ci']['explained_variance']
+        ev_label = tk.Label(ev_frame, text=f"The Explained Variance value for this model is \n{ev:.4f}"
+                                           f" ({ci_text} {ev_low:.4f} to {ev_high:.4f}).",
                             font=("Helvetica", 12), bg="#2E3B4E", fg="#D1D9E6")
         ev_label.pack(pady=5)
         ev_descrip = tk.Label(ev_frame, text=f"An Explained Variance of {ev:.4f} tells us that the model is\n"
@@ -337,7 +604,9 @@ class KpiMetrics(tk.Frame):
         mse_frame.pack(side="left", anchor="n", expand=True, fill="both", pady=10, padx=10)
         mse_title = tk.Label(mse_frame, text="Mean Squared Error", font=("Helvetica", 16), bg="#2E3B4E", fg="#D1D9E6")
         mse_title.pack(pady=10)
-        mse_label = tk.Label(mse_frame, text=f"The MSE value for this model is \n{mse:.4f}.", font=("Helvetica", 12),
+        mse_low, mse_high = kpis['ci']['mse']
+        mse_label = tk.Label(mse_frame, text=f"The MSE value for this model is \n{mse:.4f}"
+                                             f" ({ci_text} {mse_low:.4f} to {mse_high:.4f}).", font=("Helvetica", 12),
                               bg="#2E3B4E", fg="#D1D9E6")
         mse_label.pack(pady=5)
         mse_descrip = tk.Label(mse_frame, text=f"An Mean Squared Error of {mse:.4f} on a scaled range of {var:.2f} \n"
@@ -351,7 +620,9 @@ class KpiMetrics(tk.Frame):
         r2_frame.pack(side="left", anchor="n", expand=True, fill="both", pady=10, padx=10)
         r2_title = tk.Label(r2_frame, text="R-Squared", font=("Helvetica", 16), bg="#2E3B4E", fg="#D1D9E6")
         r2_title.pack(pady=10)
-        r2_label = tk.Label(r2_frame, text=f"The R2 value for this model is \n{r2:.4f}.", font=("Helvetica", 12),
+        r2_low, r2_high = kpis['ci']['r2']
+        r2_label = tk.Label(r2_frame, text=f"The R2 value for this model is \n{r2:.4f}"
+                                           f" ({ci_text} {r2_low:.4f} to {r2_high:.4f}).", font=("Helvetica", 12),
                              bg="#2E3B4E", fg="#D1D9E6")
         r2_label.pack(pady=5)
         r2_descrip = tk.Label(r2_frame, text=f"An R-Squared value of {r2:.4f} in a model\n"
@@ -360,7 +631,7 @@ class KpiMetrics(tk.Frame):
                               font=("Helvetica", 12), bg="#2E3B4E", fg="#D1D9E6")
         r2_descrip.pack(pady=5)
 
-        res_frame = tk.Frame(page_frame, bg="#2E3B4E")
+        res_frame = tk.Frame(self.page_frame, bg="#2E3B4E")
         res_frame.grid(row=2, column=0, columnspan=3, pady=20)
         res_title = tk.Label(res_frame, text="Residual Analysis", font=("Helvetica", 16), bg="#2E3B4E", fg="#D1D9E6")
         res_title.pack(pady=10)
@@ -374,32 +645,11 @@ class KpiMetrics(tk.Frame):
 
         fig = Figure(figsize=(8, 6))
         ax = fig.add_subplot(111)
-        sns.scatterplot(x=y_pred, y=residuals, ax=ax)
-        ax.axhline(0, color='red', linestyle='--', linewidth=2)
-        ax.set_title("Residual Plot")
-        ax.set_xlabel("Predicted Values")
-        ax.set_ylabel("Residuals")
+        charts.draw_residuals(ax, y_pred, residuals)
         canvas = FigureCanvasTkAgg(fig, master=res_frame)
         canvas.draw()
         canvas.get_tk_widget().pack(side="top", fill="both", expand=True)
 
-        back_frame = tk.Frame(page_frame, bg="#2E3B4E")
-        back_frame.grid(row=3, column=0, columnspan=3, pady=20)
-        back_button = tk.Button(back_frame, text="Return", font=("Verdana", 16), width=25, height=2, bg="#D1D9E6",
-                                fg="#2E3B4E", command=lambda: controller.show_frame("HomePage"))
-        back_button.pack(side="top", fill="both", expand=True, pady=10)
-
-        page_frame.update_idletasks()
-
-        def on_frame_configure(event):
-            page_canvas.configure(scrollregion=page_canvas.bbox("all"))
-
-        def on_mousewheel(event):
-            page_canvas.yview_scroll(int(-1 * (event.delta / 120)), "units")
-
-        page_frame.bind("<Configure>", on_frame_configure)
-        page_canvas.bind("<MouseWheel>", on_mousewheel)
-
 
 if __name__ == "__main__":
     install_libraries()
@@ -1,25 +1,104 @@
-import pandas as pd
+import json
+import os
+from contextlib import nullcontext
+
+from joblib import parallel_backend
 from sklearn.preprocessing import StandardScaler
 from sklearn.model_selection import train_test_split
-from sklearn.ensemble import RandomForestRegressor
+from sklearn.ensemble import HistGradientBoostingRegressor, RandomForestRegressor
+
+import artifact_cache
+from dataset_cache import load_games
+from instrumentation import instrument, span
+from schema import encode_categories
+
+
+DATA_FILE = "game_data_no_outliers.csv"
+MODEL_PARAMS = {'random_state': 42, 'n_estimators': 1000}
+SPLIT_PARAMS = {'test_size': 0.2, 'random_state': 42}
+# n_jobs=-1 uses every core; backend 'loky' fits trees in a process pool instead of sklearn's default threads.
+# batch_size grows the forest in warm-started batches so progress can be reported between them.
+TRAIN_OPTIONS = {'n_jobs': -1, 'backend': None, 'batch_size': 100}
 
+# The training engine and its parameters can be overridden by model_config.json,
+# e.g. {"engine": "hist_gb", "params": {"max_iter": 300}}.
+CONFIG_FILE = "model_config.json"
+DEFAULT_ENGINE = 'forest'
+HIST_GB_PARAMS = {'random_state': 42, 'max_iter': 300, 'learning_rate': 0.05, 'early_stopping': False,
+                  'categorical_features': ['Genre', 'Theme']}
+ENGINE_PARAMS = {'forest': MODEL_PARAMS, 'hist_gb': HIST_GB_PARAMS}
 
+
+@instrument("encoding_mapping")
 def encoding_mapping(df):
-    mapped_df = df
-    ordinal_mapping = {'free': 0, '<$15': 1, '$15-25': 2, '$25-50': 3, '$59.99': 4, '>$60': 5}
-    mapped_df['Price'] = mapped_df['Price'].astype(str).map(ordinal_mapping)
-    genre_mapping = {'AA': 11, 'RP': 12, 'ST': 13, 'SM': 14, 'SR': 15, 'VN': 16, 'PG': 17}
-    mapped_df['Genre'] = mapped_df['Genre'].astype(str).map(genre_mapping)
-    theme_mapping = {'AN': 0, 'HR': 1, 'MY': 2, 'SF': 3, 'FN': 4, 'PA': 5, 'HS': 6, 'MD': 7, 'WA': 8, 'SH': 9, 'PG': 10}
-    mapped_df['Theme'] = mapped_df['Theme'].astype(str).map(theme_mapping)
-    return mapped_df
-
-def all_data():
-    ImportData = pd.read_csv("game_data_no_outliers.csv")
-    GameData = encoding_mapping(ImportData)
+    return encode_categories(df)
+
+
+def model_config():
+    engine, params = DEFAULT_ENGINE, {}
+    if os.path.exists(CONFIG_FILE):
+        with open(CONFIG_FILE) as f:
+            config = json.load(f)
+        engine = config.get('engine', engine)
+        params = config.get('params', {})
+    if engine not in ENGINE_PARAMS:
+        raise ValueError(f"Unknown training engine {engine!r}; expected one of {', '.join(ENGINE_PARAMS)}")
+    return engine, {**ENGINE_PARAMS[engine], **params}
+
+
+def model_key(data_file=DATA_FILE):
+    engine, params = model_config()
+    return artifact_cache.artifact_key(data_file, {'engine': engine, 'model': params, 'split': SPLIT_PARAMS})
+
+
+def grow_forest(rfm, X, y, total, n_jobs=None, backend=None, batch_size=None, progress=None):
+    start = len(getattr(rfm, 'estimators_', []))
+    if total <= start:
+        return rfm
+    batch_size = batch_size or total - start
+
+    rfm.set_params(warm_start=True, n_jobs=n_jobs)
+    with parallel_backend(backend, n_jobs=n_jobs) if backend else nullcontext():
+        for n_trees in range(start + batch_size, total + batch_size, batch_size):
+            rfm.set_params(n_estimators=min(n_trees, total))
+            rfm.fit(X, y)
+            if progress is not None:
+                progress(len(rfm.estimators_) - start, total - start)
+    rfm.set_params(warm_start=False)
+    return rfm
+
+
+def fit_forest(X, y, params=None, n_jobs=None, backend=None, batch_size=None, progress=None):
+    params = MODEL_PARAMS if params is None else params
+    rfm = RandomForestRegressor(**params)
+    return grow_forest(rfm, X, y, rfm.n_estimators, n_jobs, backend, batch_size, progress)
+
+
+def fit_hist_gb(X, y, params, batch_size=None, progress=None):
+    hgb = HistGradientBoostingRegressor(**params)
+    total = hgb.max_iter
+    batch_size = batch_size or total
+
+    hgb.set_params(warm_start=True)
+    for n_iter in range(batch_size, total + batch_size, batch_size):
+        hgb.set_params(max_iter=min(n_iter, total))
+        hgb.fit(X, y)
+        if progress is not None:
+            progress(hgb.n_iter_, total)
+    hgb.set_params(warm_start=False)
+    return hgb
+
+
+def fit_model(X, y, engine, params, progress=None):
+    if engine == 'forest':
+        return fit_forest(X, y, params, progress=progress, **TRAIN_OPTIONS)
+    return fit_hist_gb(X, y, params, TRAIN_OPTIONS['batch_size'], progress)
+
+
+def split_games(GameData):
     y = GameData['Copies_per_year']
     X = GameData.drop('Copies_per_year', axis=1)
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, **SPLIT_PARAMS)
 
     scale_column = 'Copies_per_year'
     scaler = StandardScaler()
@@ -27,9 +106,35 @@ def all_data():
     y_test = y_test.to_frame()
     y_train[[scale_column]] = scaler.fit_transform(y_train[[scale_column]])
     y_test[[scale_column]] = scaler.transform(y_test[[scale_column]])
+    return X_train, X_test, y_train, y_test, scaler
+
+
+def train_model(data_file=DATA_FILE, progress=None):
+    GameData = load_games(data_file)
+    X_train, X_test, y_train, y_test, scaler = split_games(GameData)
+
+    engine, params = model_config()
+    with span("fit"):
+        rfm = fit_model(X_train, y_train.values.ravel(), engine, params, progress)
+    with span("predict"):
+        y_pred = rfm.predict(X_test)
+
+    return {'data': GameData, 'model': rfm, 'scaler': scaler, 'X_train': X_train, 'X_test': X_test,
+            'y_train': y_train, 'y_test': y_test, 'y_pred': y_pred, 'engine': engine}
+
+
+@instrument("load_model")
+def load_model(data_file=DATA_FILE, progress=None):
+    key = model_key(data_file)
+    artifact = artifact_cache.load_artifact(key, "model")
+    if artifact is None:
+        artifact_cache.save_artifact(key, "model", train_model(data_file, progress))
+        # Reloaded so a fresh model is backed by the same read-only memory maps as a cached one.
+        artifact = artifact_cache.load_artifact(key, "model")
+    return artifact
 
-    rfm = RandomForestRegressor(random_state=42, n_estimators=1000)
-    rfm.fit(X_train, y_train.values.ravel())
-    y_pred = rfm.predict(X_test)
 
-    return GameData, rfm, y_test, y_pred
+@instrument("all_data")
+def all_data(data_file=DATA_FILE, progress=None):
+    artifact = load_model(data_file, progress)
+    return artifact['data'], artifact['model'], artifact['y_test'], artifact['y_pred']
@@ -0,0 +1,79 @@
+from dataclasses import dataclass, fields
+from types import MappingProxyType
+
+import numpy as np
+import pandas as pd
+
+from importance import load_importance
+from kpis import load_kpis
+from model import DATA_FILE, load_model, model_key
+from partial_dependence import load_partial_dependence
+from slice_models import get_slice_model, prepare_slice_models
+
+
+def column_values(series):
+    # Text columns become object arrays, which, unlike pandas string arrays, can be made read-only.
+    return series.to_numpy(dtype=series.dtype if isinstance(series.dtype, np.dtype) else object)
+
+
+def read_only(value):
+    # Arrays become read-only views, tables are rebuilt on read-only column arrays and mappings become proxies, so
+    # writing through a context raises instead of changing what another thread is reading.
+    if isinstance(value, np.ndarray):
+        if value.flags.writeable:
+            value = value.view()
+            value.flags.writeable = False
+    elif isinstance(value, pd.Series):
+        values = read_only(column_values(value))
+        value = pd.Series(values, index=value.index, name=value.name, dtype=values.dtype, copy=False)
+    elif isinstance(value, pd.DataFrame):
+        value = pd.DataFrame({name: read_only(column) for name, column in value.items()}, index=value.index,
+                             columns=value.columns, copy=False)
+    elif isinstance(value, (dict, MappingProxyType)):
+        value = MappingProxyType({name: read_only(item) for name, item in value.items()})
+    return value
+
+
+def plain(value):
+    if isinstance(value, MappingProxyType):
+        return {name: plain(item) for name, item in value.items()}
+    return value
+
+
+@dataclass(frozen=True)
+class ModelContext:
+    key: str
+    engine: str
+    data: pd.DataFrame
+    features: pd.DataFrame
+    model: object
+    scaler: object
+    y_test: pd.DataFrame
+    y_pred: np.ndarray
+    importances: pd.DataFrame
+    kpis: dict
+    # Per-slice partial dependence, or None until partial_dependence.py has been run for this model.
+    dependence: dict = None
+
+    def __post_init__(self):
+        for field in fields(self):
+            object.__setattr__(self, field.name, read_only(getattr(self, field.name)))
+
+    def __reduce__(self):
+        # Mapping proxies cannot be pickled, so a context sent to another process is rebuilt from plain dicts.
+        return ModelContext, tuple(plain(getattr(self, field.name)) for field in fields(self))
+
+    def slice_model(self, kind, code):
+        return get_slice_model(kind, code, self.key, self.data, self.engine)
+
+
+def load_context(data_file=DATA_FILE, progress=None):
+    artifact = load_model(data_file, progress)
+    key = model_key(data_file)
+    engine = artifact.get('engine', 'forest')
+    prepare_slice_models(artifact['data'], key, engine)
+    return ModelContext(key=key, engine=engine, data=artifact['data'],
+                        features=artifact['data'].drop('Copies_per_year', axis=1), model=artifact['model'],
+                        scaler=artifact['scaler'], y_test=artifact['y_test'], y_pred=artifact['y_pred'],
+                        importances=load_importance(key, artifact), kpis=load_kpis(key, artifact),
+                        dependence=load_partial_dependence(key))
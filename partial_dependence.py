@@ -0,0 +1,167 @@
+import argparse
+import itertools
+import time
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+
+import artifact_cache
+from instrumentation import instrument
+from model import DATA_FILE, load_model, model_key
+from schema import FLAG_COLUMNS, PRICE_MAPPING
+from slice_models import SLICE_COLUMNS, all_slices
+
+
+ARTIFACT_NAME = "partial_dependence"
+TOP_INTERACTIONS = 10
+SEED = 42
+# Larger slices are subsampled; averaging over this many games already pins the curves down.
+MAX_SLICE_ROWS = 500
+# Rows per stacked predict call.
+MAX_BATCH_ROWS = 50000
+
+
+def settings(columns):
+    # Each setting fixes two (column, value) pairs; a single-feature setting repeats the same pair twice.
+    position = {column: i for i, column in enumerate(columns)}
+    labels, positions, values = [], [], []
+    for flag in FLAG_COLUMNS:
+        for value in (0, 1):
+            labels.append((flag, value))
+            positions.append((position[flag], position[flag]))
+            values.append((value, value))
+    for code in PRICE_MAPPING.values():
+        labels.append(('Price', code))
+        positions.append((position['Price'], position['Price']))
+        values.append((code, code))
+    for first, second in itertools.combinations(FLAG_COLUMNS, 2):
+        for a, b in itertools.product((0, 1), repeat=2):
+            labels.append((first, a, second, b))
+            positions.append((position[first], position[second]))
+            values.append((a, b))
+    return labels, np.array(positions), np.array(values, dtype=np.int8)
+
+
+def averaged_copies(estimator, scaler, X, columns, positions, values):
+    # Every setting is applied to every row of the slice and the predictions are averaged per setting. Settings are
+    # batched so that one predict call covers as many of them as MAX_BATCH_ROWS allows.
+    per_batch = max(1, MAX_BATCH_ROWS // len(X))
+    means = []
+    for start in range(0, len(positions), per_batch):
+        batch_positions, batch_values = positions[start:start + per_batch], values[start:start + per_batch]
+        batch = np.tile(X, (len(batch_positions), 1))
+        setting = np.repeat(np.arange(len(batch_positions)), len(X))
+        batch[np.arange(len(batch))[:, np.newaxis], batch_positions[setting]] = batch_values[setting]
+        predictions = estimator.predict(pd.DataFrame(batch, columns=columns))
+        means.append(predictions.reshape(len(batch_positions), len(X)).mean(axis=1))
+    # The scaler is affine, so averaging before inverse-scaling gives the same copies per year.
+    return scaler.inverse_transform(np.concatenate(means).reshape(-1, 1)).ravel()
+
+
+def slice_tables(estimator, scaler, data, kind, code, columns, labels, positions, values, top):
+    subset = data[data[SLICE_COLUMNS[kind]] == code]
+    if subset.empty:
+        return None, None
+    if len(subset) > MAX_SLICE_ROWS:
+        subset = subset.sample(MAX_SLICE_ROWS, random_state=SEED)
+    X = subset[columns].to_numpy(dtype=np.int8)
+    copies = dict(zip(labels, averaged_copies(estimator, scaler, X, columns, positions, values)))
+
+    single = [label for label in labels if len(label) == 2]
+    dependence = pd.DataFrame({'kind': kind, 'code': code, 'feature': [feature for feature, value in single],
+                               'value': [value for feature, value in single],
+                               'copies': np.array([copies[label] for label in single], dtype=np.float32)})
+
+    pairs = []
+    for first, second in itertools.combinations(FLAG_COLUMNS, 2):
+        # Second difference: how much adding both flags differs from the sum of adding each on its own.
+        interaction = (copies[(first, 1, second, 1)] - copies[(first, 1, second, 0)]
+                       - copies[(first, 0, second, 1)] + copies[(first, 0, second, 0)])
+        pairs.append((first, second, interaction))
+    pairs.sort(key=lambda pair: abs(pair[2]), reverse=True)
+    interactions = pd.DataFrame(pairs[:top], columns=['feature_a', 'feature_b', 'interaction'])
+    interactions['interaction'] = interactions['interaction'].astype(np.float32)
+    interactions.insert(0, 'rank', np.arange(len(interactions)))
+    interactions.insert(0, 'code', code)
+    interactions.insert(0, 'kind', kind)
+    return dependence, interactions
+
+
+@instrument("partial_dependence")
+def compute_partial_dependence(artifact, top=TOP_INTERACTIONS, n_jobs=-1):
+    data = artifact['data']
+    columns = list(data.drop('Copies_per_year', axis=1).columns)
+    labels, positions, values = settings(columns)
+    results = Parallel(n_jobs=n_jobs, prefer='threads')(
+        delayed(slice_tables)(artifact['model'], artifact['scaler'], data, kind, code, columns, labels, positions,
+                              values, top)
+        for kind, code in all_slices())
+
+    dependence = pd.concat([table for table, _ in results if table is not None], ignore_index=True)
+    interactions = pd.concat([table for _, table in results if table is not None], ignore_index=True)
+    return {'top': top,
+            'dependence': dependence.set_index(['kind', 'code', 'feature', 'value']).sort_index(),
+            'interactions': interactions.set_index(['kind', 'code', 'rank']).sort_index()}
+
+
+def flag_effects(tables, kind, code):
+    # Change in predicted copies per year from setting each flag, averaged over the games in the slice.
+    flags = tables['dependence'].loc[(kind, code, list(FLAG_COLUMNS)), 'copies'].unstack('value')
+    flags.index = flags.index.get_level_values('feature')
+    return (flags[1] - flags[0]).sort_values(ascending=False)
+
+
+def price_curve(tables, kind, code):
+    curve = tables['dependence'].loc[(kind, code, 'Price'), 'copies']
+    curve.index = [label for label, tier in PRICE_MAPPING.items()]
+    return curve
+
+
+def top_interactions(tables, kind, code):
+    return tables['interactions'].loc[(kind, code)]
+
+
+def index_tables(tables):
+    # One dict entry per slice, so every query after loading is a single dictionary lookup.
+    index = {}
+    for kind, code in tables['interactions'].index.droplevel('rank').unique():
+        index[(kind, code)] = {'flag_effects': flag_effects(tables, kind, code),
+                               'price_curve': price_curve(tables, kind, code),
+                               'interactions': top_interactions(tables, kind, code)}
+    return index
+
+
+def load_partial_dependence(key):
+    # Computed offline by main(); None until then.
+    tables = artifact_cache.load_artifact(key, ARTIFACT_NAME, mmap=False)
+    return None if tables is None else index_tables(tables)
+
+
+def summary_text(entry, limit=3):
+    effects = entry['flag_effects']
+    lines = ["Flags that lift predicted sales most: " + ", ".join(
+        f"{flag} {effect:+,.0f}" for flag, effect in effects.head(limit).items())]
+    strongest = entry['interactions'].iloc[0]
+    lines.append(f"Strongest interaction: {strongest['feature_a']} with {strongest['feature_b']} "
+                 f"({strongest['interaction']:+,.0f} copies/year beyond their separate effects)")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Precompute partial dependence and flag interactions for every "
+                                                 "genre and theme slice.")
+    parser.add_argument("--data-file", default=DATA_FILE)
+    parser.add_argument("--top", type=int, default=TOP_INTERACTIONS, help="interactions kept per slice")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    key = model_key(args.data_file)
+    tables = compute_partial_dependence(load_model(args.data_file), args.top)
+    path = artifact_cache.save_artifact(key, ARTIFACT_NAME, tables)
+    print(f"Partial dependence for {len(all_slices())} slices written to {path} in "
+          f"{time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+import argparse
+import html
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+
+matplotlib.use("Agg")
+
+from matplotlib.figure import Figure
+
+import charts
+import data_getters
+from model import DATA_FILE
+from schema import GENRE_NAMES, THEME_NAMES
+
+
+REPORT_DIR = "report"
+FIGURE_SIZE = (8, 6)
+DPI = 100
+
+
+def init_worker(data_file):
+    # Every artifact the report needs is already cached by the parent, so this is a load, not a retrain.
+    data_getters.initialize_model(data_file=data_file)
+
+
+def save_figure(fig, output_dir, filename):
+    fig.tight_layout()
+    fig.savefig(os.path.join(output_dir, filename), dpi=DPI)
+    return filename
+
+
+def render_breakdown(kind, name, output_dir):
+    started = time.perf_counter()
+    if kind == 'genre':
+        grouped_df, group_column = data_getters.model_by_genre(name), 'Theme'
+    else:
+        grouped_df, group_column = data_getters.model_by_theme(name), 'Genre'
+
+    fig = Figure(figsize=FIGURE_SIZE)
+    charts.draw_breakdown(fig.add_subplot(111), grouped_df, group_column,
+                          f"{name}: Actual vs Predicted Sales by {group_column}")
+    filename = save_figure(fig, output_dir, f"{kind}_{name.lower().replace(' ', '_')}.png")
+    return {'kind': kind, 'name': name, 'image': filename, 'seconds': time.perf_counter() - started}
+
+
+def render_residuals(output_dir):
+    started = time.perf_counter()
+    kpis = data_getters.get_kpis()
+    fig = Figure(figsize=FIGURE_SIZE)
+    charts.draw_residuals(fig.add_subplot(111), kpis['y_pred'], kpis['residuals'])
+    filename = save_figure(fig, output_dir, "residuals.png")
+    return {'kind': 'residuals', 'name': "Residual Plot", 'image': filename, 'seconds': time.perf_counter() - started}
+
+
+def kpi_rows(kpis):
+    rows = []
+    for label, name in (("Mean Squared Error", 'mse'), ("R-Squared", 'r2'),
+                        ("Explained Variance", 'explained_variance')):
+        low, high = kpis['ci'][name]
+        rows.append((label, f"{kpis[name]:.4f}", f"{low:.4f} to {high:.4f}"))
+    rows.append(("Scaled target range", f"{kpis['variance']:.2f}", ""))
+    return rows
+
+
+def write_html(output_dir, kpis, charts_rendered, seconds):
+    def images(kind, heading):
+        figures = "".join(f'<figure><img src="{html.escape(chart["image"])}" alt="{html.escape(chart["name"])}">'
+                          f'<figcaption>{html.escape(chart["name"])}</figcaption></figure>\n'
+                          for chart in charts_rendered if chart['kind'] == kind)
+        return f"<h2>{heading}</h2>\n{figures}"
+
+    table = "".join(f"<tr><td>{label}</td><td>{value}</td><td>{interval}</td></tr>\n"
+                    for label, value, interval in kpi_rows(kpis))
+    page = (f"<!DOCTYPE html>\n<html>\n<head><meta charset=\"utf-8\"><title>Sales model report</title>\n"
+            f"<style>body {{font-family: Helvetica, sans-serif; margin: 2em;}} figure {{display: inline-block;}} "
+            f"img {{width: 480px;}} td, th {{padding: 4px 12px; text-align: left;}}</style></head>\n<body>\n"
+            f"<h1>Sales model report</h1>\n<p>Generated {time.strftime('%Y-%m-%d %H:%M')} in {seconds:.1f}s.</p>\n"
+            f"<h2>KPIs</h2>\n<table>\n<tr><th>Metric</th><th>Value</th>"
+            f"<th>{kpis['confidence']:.0%} bootstrap CI</th></tr>\n{table}</table>\n"
+            f"{images('residuals', 'Residual Analysis')}{images('genre', 'By Genre')}{images('theme', 'By Theme')}"
+            f"</body>\n</html>\n")
+    path = os.path.join(output_dir, "index.html")
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(page)
+    return path
+
+
+def build_report(output_dir=REPORT_DIR, data_file=DATA_FILE, workers=None):
+    started = time.perf_counter()
+    os.makedirs(output_dir, exist_ok=True)
+    # Training, slice models, importances and KPIs are cached once here, before any worker starts.
+    data_getters.initialize_model(data_file=data_file)
+
+    tasks = [('genre', name) for name in GENRE_NAMES.values()] + [('theme', name) for name in THEME_NAMES.values()]
+    workers = min(workers or os.cpu_count(), len(tasks) + 1)
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(workers, mp_context=context, initializer=init_worker,
+                             initargs=(data_file,)) as pool:
+        futures = [pool.submit(render_residuals, output_dir)]
+        futures += [pool.submit(render_breakdown, kind, name, output_dir) for kind, name in tasks]
+        rendered = [future.result() for future in futures]
+
+    seconds = time.perf_counter() - started
+    return write_html(output_dir, data_getters.get_kpis(), rendered, seconds), rendered, seconds
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render every breakdown chart, the residual plot and the KPIs to "
+                                                 "PNGs and an HTML summary without the GUI.")
+    parser.add_argument("--output-dir", default=REPORT_DIR)
+    parser.add_argument("--data-file", default=DATA_FILE)
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per CPU)")
+    args = parser.parse_args(argv)
+
+    path, rendered, seconds = build_report(args.output_dir, args.data_file, args.workers)
+    slowest = max(rendered, key=lambda chart: chart['seconds'])
+    print(f"Rendered {len(rendered)} charts in {seconds:.1f}s (slowest: {slowest['name']}, "
+          f"{slowest['seconds']:.2f}s); summary at {path}")
+
+
+if __name__ == "__main__":
+    main()
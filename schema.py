@@ -0,0 +1,59 @@
+from types import MappingProxyType
+
+import numpy as np
+import pandas as pd
+
+
+TARGET = 'Copies_per_year'
+
+PRICE_MAPPING = MappingProxyType({'free': 0, '<$15': 1, '$15-25': 2, '$25-50': 3, '$59.99': 4, '>$60': 5})
+GENRE_MAPPING = MappingProxyType({'AA': 11, 'RP': 12, 'ST': 13, 'SM': 14, 'SR': 15, 'VN': 16, 'PG': 17})
+THEME_MAPPING = MappingProxyType({'AN': 0, 'HR': 1, 'MY': 2, 'SF': 3, 'FN': 4, 'PA': 5, 'HS': 6, 'MD': 7, 'WA': 8,
+                                  'SH': 9, 'PG': 10})
+CATEGORY_MAPPINGS = MappingProxyType({'Price': PRICE_MAPPING, 'Genre': GENRE_MAPPING, 'Theme': THEME_MAPPING})
+
+FLAG_COLUMNS = ('Co_op', 'PvP', 'MMO', 'VR_capable', 'Microtransactions', 'Survival', 'Building', 'Open_world',
+                'Sandbox', 'Crafting_system', 'Management', 'Combat', 'Hack_slash', 'Shooter', 'Stealth',
+                'Dungeon_crawler', 'Roguelike', 'Platformer', 'Story_rich', 'Choices_matter', 'eSports', 'Team_based',
+                'Puzzles', 'Exploration', 'RTS', 'Card_board', 'Physics_engine')
+CATEGORY_COLUMNS = tuple(CATEGORY_MAPPINGS)
+FEATURE_COLUMNS = CATEGORY_COLUMNS + FLAG_COLUMNS
+COLUMNS = (TARGET,) + FEATURE_COLUMNS
+
+GENRE_NAMES = MappingProxyType({11: "Action-Adventure", 12: "Role-Playing", 13: "Strategy", 14: "Simulation",
+                                15: "Sports and Racing", 16: "Visual Novels", 17: "Party Games"})
+THEME_NAMES = MappingProxyType({0: "Anime", 1: "Horror", 2: "Mystery", 3: "Science-fiction", 4: "Fantasy",
+                                5: "Post-apocalyptic", 6: "History", 7: "Modern", 8: "War", 9: "Superhero"})
+CODE_TO_NAME = MappingProxyType({**GENRE_NAMES, **THEME_NAMES})
+NAME_TO_CODE = MappingProxyType({name: code for code, name in CODE_TO_NAME.items()})
+
+CATEGORY_DTYPES = MappingProxyType({column: pd.CategoricalDtype(list(mapping))
+                                    for column, mapping in CATEGORY_MAPPINGS.items()})
+CODE_LOOKUPS = MappingProxyType({column: np.array(list(mapping.values()), dtype=np.int8)
+                                 for column, mapping in CATEGORY_MAPPINGS.items()})
+# Categories are inferred while parsing so unknown codes can be reported before they are fixed to the schema.
+CSV_DTYPES = MappingProxyType({TARGET: 'int64', **{column: 'category' for column in CATEGORY_COLUMNS},
+                               **{flag: 'uint8' for flag in FLAG_COLUMNS}})
+
+
+def encode_column(values, column):
+    if not isinstance(values.dtype, pd.CategoricalDtype):
+        values = values.astype('category')
+    unknown = sorted(str(value) for value in set(values.cat.categories) - set(CATEGORY_MAPPINGS[column]))
+    if unknown:
+        raise ValueError(f"Unknown {column} codes: {', '.join(unknown)}")
+
+    codes = values.cat.set_categories(CATEGORY_DTYPES[column].categories).cat.codes.to_numpy()
+    if (codes < 0).any():
+        rows = ", ".join(str(row) for row in values.index[codes < 0][:10])
+        raise ValueError(f"Missing {column} values in rows {rows}")
+    return pd.Series(CODE_LOOKUPS[column][codes], index=values.index, name=column)
+
+
+def encode_categories(df):
+    encoded = df.copy(deep=False)
+    for column in CATEGORY_COLUMNS:
+        if column in encoded.columns:
+            encoded[column] = encode_column(df[column], column)
+    return encoded
+
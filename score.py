@@ -0,0 +1,55 @@
+import argparse
+import sys
+
+import pandas as pd
+
+from model import DATA_FILE, encoding_mapping, load_model
+from schema import CSV_DTYPES, FLAG_COLUMNS, TARGET
+
+
+CHUNK_SIZE = 50000
+PREDICTION_COLUMN = 'Predicted_copies_per_year'
+# The target column is optional and may be blank in files of candidate games, so it is left untyped.
+FEATURE_DTYPES = {column: dtype for column, dtype in CSV_DTYPES.items() if column != TARGET}
+
+
+def predict_copies(artifact, features):
+    scaled_pred = artifact['model'].predict(features)
+    return artifact['scaler'].inverse_transform(scaled_pred.reshape(-1, 1)).ravel()
+
+
+def encode_features(chunk, feature_columns):
+    features = encoding_mapping(chunk[feature_columns])
+    invalid = [flag for flag in feature_columns if flag in FLAG_COLUMNS
+               and not (pd.api.types.is_numeric_dtype(features[flag]) and features[flag].isin((0, 1)).all())]
+    if invalid:
+        raise ValueError(f"Flags must be 0 or 1: {', '.join(invalid)}")
+    return features
+
+
+def score_file(input_path, output_path, chunk_size=CHUNK_SIZE, data_file=DATA_FILE):
+    artifact = load_model(data_file)
+    feature_columns = list(artifact['X_train'].columns)
+    scored = 0
+    with open(output_path, 'w', newline='') as output:
+        for chunk in pd.read_csv(input_path, chunksize=chunk_size, dtype=FEATURE_DTYPES):
+            features = encode_features(chunk, feature_columns)
+            chunk[PREDICTION_COLUMN] = predict_copies(artifact, features)
+            chunk.to_csv(output, header=(scored == 0), index=False)
+            scored += len(chunk)
+            print(f"Scored {scored} rows", file=sys.stderr)
+    return scored
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Predict copies sold per year for a CSV of candidate games.")
+    parser.add_argument("input", help="CSV with the same feature columns as the training data")
+    parser.add_argument("output", help="CSV to write the input rows and their predictions to")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="rows read and scored at a time")
+    parser.add_argument("--data-file", default=DATA_FILE, help="training CSV the cached model was built from")
+    args = parser.parse_args(argv)
+    score_file(args.input, args.output, args.chunk_size, args.data_file)
+
+
+if __name__ == "__main__":
+    main()
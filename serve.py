@@ -0,0 +1,193 @@
+import argparse
+import asyncio
+import json
+import time
+
+import pandas as pd
+
+from flat_forest import load_flat_forest
+from model import DATA_FILE, load_model
+from score import encode_features, predict_copies
+
+
+HOST = "127.0.0.1"
+PORT = 8642
+BATCH_WINDOW = 0.005
+MAX_BATCH_ROWS = 4096
+STATUS_TEXT = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+               500: "Internal Server Error"}
+
+
+class MicroBatcher:
+    def __init__(self, artifact, window=BATCH_WINDOW, max_rows=MAX_BATCH_ROWS):
+        self.artifact = artifact
+        self.window = window
+        self.max_rows = max_rows
+        self.pending = asyncio.Queue()
+
+    async def predict(self, features):
+        future = asyncio.get_running_loop().create_future()
+        await self.pending.put((features, future))
+        return await future
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.pending.get()]
+            rows = len(batch[0][0])
+            deadline = loop.time() + self.window
+            while rows < self.max_rows:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.pending.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                batch.append(item)
+                rows += len(item[0])
+
+            features = pd.concat([item[0] for item in batch], ignore_index=True)
+            try:
+                predictions = await loop.run_in_executor(None, predict_copies, self.artifact, features)
+            except Exception:
+                # Retry each request on its own so one bad request only fails itself, not the batch it joined.
+                await self.predict_each(batch)
+                continue
+
+            start = 0
+            for item_features, future in batch:
+                end = start + len(item_features)
+                if not future.done():
+                    future.set_result(predictions[start:end].tolist())
+                start = end
+
+    async def predict_each(self, batch):
+        loop = asyncio.get_running_loop()
+        for features, future in batch:
+            try:
+                predictions = await loop.run_in_executor(None, predict_copies, self.artifact, features)
+            except Exception as error:
+                if not future.done():
+                    future.set_exception(error)
+            else:
+                if not future.done():
+                    future.set_result(predictions.tolist())
+
+
+def parse_rows(body):
+    payload = json.loads(body)
+    if isinstance(payload, dict):
+        payload = payload.get('rows', [payload])
+    if not isinstance(payload, list) or not payload or not all(isinstance(row, dict) for row in payload):
+        raise ValueError("Expected a feature object, a list of feature objects or {\"rows\": [...]}")
+    if any(isinstance(value, (list, dict)) for row in payload for value in row.values()):
+        raise ValueError("Feature values must be strings or numbers")
+    return pd.DataFrame.from_records(payload)
+
+
+async def read_request(reader):
+    request_line = await reader.readline()
+    if not request_line:
+        return None
+    method, path, version = request_line.decode('latin-1').split()
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    body = await reader.readexactly(int(headers.get('content-length', 0)))
+    keep_alive = headers.get('connection', '').lower() != 'close' and version == 'HTTP/1.1'
+    return method, path, body, keep_alive
+
+
+def write_response(writer, status, payload, keep_alive):
+    body = json.dumps(payload).encode()
+    head = (f"HTTP/1.1 {status} {STATUS_TEXT[status]}\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    writer.write(head.encode('latin-1') + body)
+
+
+async def handle_connection(reader, writer, batcher, feature_columns):
+    try:
+        while True:
+            try:
+                request = await read_request(reader)
+            except (ValueError, asyncio.IncompleteReadError):
+                write_response(writer, 400, {'error': "Malformed HTTP request"}, False)
+                break
+            if request is None:
+                break
+            method, path, body, keep_alive = request
+
+            if path == '/health':
+                status, payload = 200, {'status': "ok"}
+            elif path != '/predict':
+                status, payload = 404, {'error': f"Unknown path {path}"}
+            elif method != 'POST':
+                status, payload = 405, {'error': "Use POST for /predict"}
+            else:
+                try:
+                    features = encode_features(parse_rows(body), feature_columns)
+                except (ValueError, KeyError, TypeError) as error:
+                    status, payload = 400, {'error': str(error)}
+                else:
+                    started = time.perf_counter()
+                    try:
+                        predictions = await batcher.predict(features)
+                    except Exception as error:
+                        status, payload = 500, {'error': f"Prediction failed: {error}"}
+                    else:
+                        status, payload = 200, {'predictions': predictions,
+                                                'latency_ms': (time.perf_counter() - started) * 1000}
+
+            write_response(writer, status, payload, keep_alive)
+            await writer.drain()
+            if not keep_alive:
+                break
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(host=HOST, port=PORT, data_file=DATA_FILE, window=BATCH_WINDOW, flat=False):
+    artifact = load_model(data_file)
+    if flat:
+        artifact = dict(artifact, model=load_flat_forest(data_file))
+    feature_columns = list(artifact['X_train'].columns)
+    batcher = MicroBatcher(artifact, window)
+    batch_task = asyncio.create_task(batcher.run())
+
+    server = await asyncio.start_server(
+        lambda reader, writer: handle_connection(reader, writer, batcher, feature_columns), host, port)
+    print(f"Serving predictions on http://{host}:{port}/predict")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        batch_task.cancel()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve copies-per-year predictions over local HTTP.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--data-file", default=DATA_FILE, help="training CSV the cached model was built from")
+    parser.add_argument("--batch-window", type=float, default=BATCH_WINDOW,
+                        help="seconds to wait for more requests before running a batch")
+    parser.add_argument("--flat-forest", action="store_true",
+                        help="predict with the flattened NumPy forest instead of sklearn")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port, args.data_file, args.batch_window, args.flat_forest))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
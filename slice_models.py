@@ -0,0 +1,95 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+from joblib import Parallel, delayed
+from sklearn.ensemble import HistGradientBoostingRegressor, RandomForestRegressor
+
+import artifact_cache
+from instrumentation import instrument
+from model import ENGINE_PARAMS, model_config
+from schema import GENRE_NAMES, THEME_NAMES
+
+
+GENRE_CODES = tuple(GENRE_NAMES)
+THEME_CODES = tuple(THEME_NAMES)
+SLICE_COLUMNS = {'genre': 'Genre', 'theme': 'Theme'}
+# Seeded so a persisted slice model is the same one a retrain would produce.
+SLICE_PARAMS = {'random_state': 42}
+SLICE_ESTIMATORS = {'forest': RandomForestRegressor, 'hist_gb': HistGradientBoostingRegressor}
+# Slices hold a few dozen games, so boosted slice models allow leaves of about a tenth of the slice instead of the
+# full model's 20 games, which would leave every tree of a small slice a single leaf.
+SLICE_LEAF_FRACTION = 0.1
+CACHE_SIZE = 8
+
+# Keyed by (model key, kind, code) so slice models of different model versions can be cached side by side.
+lru = OrderedDict()
+lru_lock = threading.Lock()
+
+
+def slice_name(kind, code, engine='forest'):
+    # The name carries a digest of the slice parameters, so changing them refits the slice models instead of loading
+    # ones fitted with the old parameters.
+    config = json.dumps({'params': engine_slice_params(engine), 'leaf_fraction': SLICE_LEAF_FRACTION}, sort_keys=True)
+    return f"slices/{kind}_{code}_{hashlib.sha256(config.encode()).hexdigest()[:8]}"
+
+
+def all_slices():
+    return [('genre', code) for code in GENRE_CODES] + [('theme', code) for code in THEME_CODES]
+
+
+def engine_slice_params(engine):
+    if engine == 'forest':
+        return SLICE_PARAMS
+    configured_engine, params = model_config()
+    return params if configured_engine == engine else ENGINE_PARAMS[engine]
+
+
+def slice_params(engine, rows):
+    params = engine_slice_params(engine)
+    if engine == 'forest':
+        return params
+    return {**params, 'min_samples_leaf': max(1, min(20, int(rows * SLICE_LEAF_FRACTION)))}
+
+
+def fit_slice(df, kind, code, engine='forest'):
+    subset = df[df[SLICE_COLUMNS[kind]] == code]
+    if subset.empty:
+        return None
+    X = subset.drop('Copies_per_year', axis=1)
+    y = subset['Copies_per_year']
+    mini_model = SLICE_ESTIMATORS[engine](**slice_params(engine, len(subset)))
+    mini_model.fit(X, y)
+    return mini_model
+
+
+@instrument("prepare_slice_models")
+def prepare_slice_models(df, key, engine='forest', n_jobs=-1):
+    missing = [(kind, code) for kind, code in all_slices()
+               if not artifact_cache.has_artifact(key, slice_name(kind, code, engine))]
+    if missing:
+        fitted = Parallel(n_jobs=n_jobs, backend='loky')(delayed(fit_slice)(df, kind, code, engine)
+                                                                  for kind, code in missing)
+        for (kind, code), mini_model in zip(missing, fitted):
+            artifact_cache.save_artifact(key, slice_name(kind, code, engine), mini_model)
+
+
+def get_slice_model(kind, code, key, df, engine='forest'):
+    with lru_lock:
+        if (key, kind, code) in lru:
+            lru.move_to_end((key, kind, code))
+            return lru[(key, kind, code)]
+
+    name = slice_name(kind, code, engine)
+    mini_model = artifact_cache.load_artifact(key, name)
+    if mini_model is None and not artifact_cache.has_artifact(key, name):
+        mini_model = fit_slice(df, kind, code, engine)
+        artifact_cache.save_artifact(key, name, mini_model)
+
+    with lru_lock:
+        lru[(key, kind, code)] = mini_model
+        lru.move_to_end((key, kind, code))
+        while len(lru) > CACHE_SIZE:
+            lru.popitem(last=False)
+    return mini_model
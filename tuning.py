@@ -0,0 +1,184 @@
+import argparse
+import itertools
+import json
+import os
+import pickle
+import tempfile
+import time
+
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.metrics import mean_squared_error, r2_score
+from sklearn.model_selection import KFold
+
+import model
+from dataset_cache import load_games
+
+
+GRID = {'n_estimators': [25, 50, 100, 200, 500, 1000], 'max_depth': [None, 6, 12],
+        'max_features': [1.0, 0.5, 'sqrt'], 'min_samples_leaf': [1, 2, 5]}
+RESULTS_FILE = "tuning_results.json"
+# Configurations within this much R^2 of the best score count as equally accurate when picking the cheapest one.
+TOLERANCE = 0.005
+LATENCY_ROWS = 1000
+LATENCY_REPEATS = 3
+
+
+def share_training_data(data_file, work_dir):
+    # Tuning only sees the training split, so the test split stays held out. The arrays are written once as float32
+    # (the dtype the trees use) and every worker memory-maps them instead of receiving its own copy.
+    X_train, X_test, y_train, y_test, scaler = model.split_games(load_games(data_file))
+    paths = {'X': os.path.join(work_dir, "X.npy"), 'y': os.path.join(work_dir, "y.npy")}
+    np.save(paths['X'], np.ascontiguousarray(X_train.to_numpy(dtype=np.float32)))
+    np.save(paths['y'], y_train.to_numpy(dtype=np.float64).ravel())
+    return paths
+
+
+def load_shared(paths):
+    return np.load(paths['X'], mmap_mode='r'), np.load(paths['y'], mmap_mode='r')
+
+
+def model_cost(forest, X):
+    batch = np.asarray(X[:LATENCY_ROWS])
+    timings = []
+    for _ in range(LATENCY_REPEATS):
+        started = time.perf_counter()
+        forest.predict(batch)
+        timings.append(time.perf_counter() - started)
+    return {'predict_ms': min(timings) * 1000 / len(batch) * LATENCY_ROWS,
+            'model_mb': len(pickle.dumps(forest, protocol=pickle.HIGHEST_PROTOCOL)) / (1024 * 1024),
+            'nodes': int(sum(tree.tree_.node_count for tree in forest.estimators_))}
+
+
+def grow(forest, sizes, X, y):
+    # Each forest size warm-starts from the previous one, so a whole n_estimators sweep costs one largest forest.
+    for n_estimators in sizes:
+        forest.set_params(n_estimators=n_estimators)
+        forest.fit(X, y)
+        yield n_estimators
+
+
+def evaluate_oob(paths, params, sizes):
+    X, y = load_shared(paths)
+    forest = RandomForestRegressor(**params, oob_score=True, warm_start=True, n_jobs=1)
+    results = []
+    for n_estimators in grow(forest, sizes, X, y):
+        results.append(dict(params, n_estimators=n_estimators, r2=forest.oob_score_,
+                            mse=mean_squared_error(y, forest.oob_prediction_), **model_cost(forest, X)))
+    return results
+
+
+def evaluate_cv(paths, params, sizes, folds):
+    X, y = load_shared(paths)
+    predictions = {n_estimators: np.empty(len(y)) for n_estimators in sizes}
+    costs = {}
+    for train_rows, test_rows in KFold(folds, shuffle=True, random_state=42).split(X):
+        forest = RandomForestRegressor(**params, warm_start=True, n_jobs=1)
+        for n_estimators in grow(forest, sizes, X[train_rows], y[train_rows]):
+            predictions[n_estimators][test_rows] = forest.predict(X[test_rows])
+            costs[n_estimators] = model_cost(forest, X)
+    return [dict(params, n_estimators=n_estimators, r2=r2_score(y, predictions[n_estimators]),
+                 mse=mean_squared_error(y, predictions[n_estimators]), **costs[n_estimators])
+            for n_estimators in sizes]
+
+
+def search(data_file=model.DATA_FILE, grid=GRID, scoring='oob', folds=5, n_jobs=-1):
+    sizes = sorted(grid['n_estimators'])
+    fixed = {key: value for key, value in model.MODEL_PARAMS.items() if key != 'n_estimators'}
+    combos = [dict(fixed, max_depth=depth, max_features=features, min_samples_leaf=leaf)
+              for depth, features, leaf in itertools.product(grid['max_depth'], grid['max_features'],
+                                                             grid['min_samples_leaf'])]
+    with tempfile.TemporaryDirectory() as work_dir:
+        paths = share_training_data(data_file, work_dir)
+        if scoring == 'oob':
+            tasks = (delayed(evaluate_oob)(paths, params, sizes) for params in combos)
+        else:
+            tasks = (delayed(evaluate_cv)(paths, params, sizes, folds) for params in combos)
+        # Each worker grows its forests single-threaded; the pool provides the parallelism.
+        batches = Parallel(n_jobs=n_jobs, backend='loky')(tasks)
+    return [result for batch in batches for result in batch]
+
+
+def dominates(a, b):
+    no_worse = a['r2'] >= b['r2'] and a['predict_ms'] <= b['predict_ms'] and a['model_mb'] <= b['model_mb']
+    better = a['r2'] > b['r2'] or a['predict_ms'] < b['predict_ms'] or a['model_mb'] < b['model_mb']
+    return no_worse and better
+
+
+def pareto_front(results):
+    front = [a for a in results if not any(dominates(b, a) for b in results)]
+    return sorted(front, key=lambda result: result['predict_ms'])
+
+
+def choose(results, tolerance=TOLERANCE):
+    best = max(result['r2'] for result in results)
+    candidates = [result for result in pareto_front(results) if result['r2'] >= best - tolerance]
+    return min(candidates, key=lambda result: (result['predict_ms'], result['model_mb']))
+
+
+def chosen_params(result):
+    return {key: result[key] for key in ('n_estimators', 'max_depth', 'max_features', 'min_samples_leaf')}
+
+
+def write_config(params, path=None):
+    path = path or model.CONFIG_FILE
+    with open(path, 'w') as f:
+        json.dump({'engine': 'forest', 'params': params}, f, indent=2)
+
+
+def grid_value(text):
+    if text == 'None':
+        return None
+    for parse in (int, float):
+        try:
+            return parse(text)
+        except ValueError:
+            pass
+    return text
+
+
+def describe(result):
+    return (f"{result['n_estimators']:>5} trees  depth {str(result['max_depth']):>4}  "
+            f"features {str(result['max_features']):>4}  leaf {result['min_samples_leaf']:>2}  "
+            f"R2 {result['r2']:7.4f}  MSE {result['mse']:7.4f}  {result['predict_ms']:8.2f} ms/{LATENCY_ROWS} rows  "
+            f"{result['model_mb']:8.2f} MB")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Search forest sizes and tree parameters for the best "
+                                                 "accuracy / latency / size trade-off.")
+    parser.add_argument("--data-file", default=model.DATA_FILE)
+    parser.add_argument("--scoring", choices=['oob', 'cv'], default='oob',
+                        help="out-of-bag score, or K-fold cross-validation on the training split")
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--n-jobs", type=int, default=-1)
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE,
+                        help="R^2 a cheaper configuration may give up against the best one")
+    for name, values in GRID.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=grid_value, nargs='+', default=values)
+    parser.add_argument("--output", default=RESULTS_FILE, help="JSON file for every evaluated configuration")
+    parser.add_argument("--write-config", action='store_true',
+                        help=f"save the chosen configuration to {model.CONFIG_FILE} for training to use")
+    args = parser.parse_args(argv)
+
+    grid = {name: getattr(args, name) for name in GRID}
+    results = search(args.data_file, grid, args.scoring, args.folds, args.n_jobs)
+    front = pareto_front(results)
+    chosen = choose(results, args.tolerance)
+
+    print(f"Pareto front ({len(front)} of {len(results)} configurations, {args.scoring} scoring):")
+    for result in front:
+        print(("* " if result is chosen else "  ") + describe(result))
+    with open(args.output, 'w') as f:
+        json.dump({'scoring': args.scoring, 'tolerance': args.tolerance, 'chosen': chosen_params(chosen),
+                   'pareto': front, 'results': results}, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.write_config:
+        write_config(chosen_params(chosen))
+        print(f"Chosen configuration written to {model.CONFIG_FILE}; the model retrains on next load.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+
+from schema import CATEGORY_MAPPINGS, FEATURE_COLUMNS, FLAG_COLUMNS, PRICE_MAPPING, encode_categories
+
+
+# Pairs of changes scored per predict call.
+CHUNK_ROWS = 20000
+TOP_PAIRS = 20
+PRICE_LABELS = {code: label for label, code in PRICE_MAPPING.items()}
+
+
+def encode_game(game):
+    # game maps every feature column to its CSV value, e.g. {'Price': '$15-25', 'Genre': 'AA', 'Co_op': 1, ...}.
+    row = pd.DataFrame([game])[list(FEATURE_COLUMNS)]
+    row = row.astype({column: pd.CategoricalDtype(list(mapping)) for column, mapping in CATEGORY_MAPPINGS.items()})
+    return encode_categories(row).iloc[0]
+
+
+def single_changes(game):
+    changes = [(flag, 1 - int(game[flag])) for flag in FLAG_COLUMNS]
+    changes += [('Price', code) for code in PRICE_MAPPING.values() if code != game['Price']]
+    return changes
+
+
+def describe(game, changes):
+    parts = []
+    for column, value in changes:
+        if column == 'Price':
+            parts.append(f"Price {PRICE_LABELS[game['Price']]} -> {PRICE_LABELS[value]}")
+        else:
+            parts.append(f"{'Add' if value else 'Drop'} {column}")
+    return " + ".join(parts)
+
+
+def predict_copies(estimator, scaler, base, columns, positions, values):
+    # Row i of the batch is the base game with columns positions[i] set to values[i]; one predict scores them all.
+    X = np.repeat(base[np.newaxis, :], len(positions), axis=0)
+    X[np.arange(len(positions))[:, np.newaxis], positions] = values
+    scaled = estimator.predict(pd.DataFrame(X, columns=columns))
+    return scaler.inverse_transform(scaled.reshape(-1, 1)).ravel()
+
+
+def ranked(game, variants, copies, baseline):
+    return pd.DataFrame({'change': [describe(game, changes) for changes in variants], 'predicted_copies': copies,
+                         'uplift': copies - baseline}).sort_values('uplift', ascending=False, ignore_index=True)
+
+
+def explore(estimator, scaler, game, columns, pairs=False, top_pairs=TOP_PAIRS, chunk_rows=CHUNK_ROWS):
+    columns = list(columns)
+    base = game[columns].to_numpy(dtype=np.int64)
+    changes = single_changes(game)
+    change_positions = np.array([columns.index(column) for column, value in changes])
+    change_values = np.array([value for column, value in changes])
+
+    # The unchanged game rides along as row 0 (column 0 "set" to its own value) so the baseline shares the batch.
+    positions = np.concatenate([[0], change_positions])[:, np.newaxis]
+    values = np.concatenate([[base[0]], change_values])[:, np.newaxis]
+    copies = predict_copies(estimator, scaler, base, columns, positions, values)
+    baseline, single_copies = copies[0], copies[1:]
+    result = {'baseline': float(baseline), 'single': ranked(game, [(change,) for change in changes],
+                                                            single_copies, baseline), 'pairs': None}
+    if not pairs:
+        return result
+
+    first, second = np.triu_indices(len(changes), 1)
+    # Two changes to the same column (two price tiers) cannot be combined.
+    keep = change_positions[first] != change_positions[second]
+    first, second = first[keep], second[keep]
+    best_pairs = np.empty((0, 2), dtype=np.int64)
+    best_copies = np.empty(0)
+    for start in range(0, len(first), chunk_rows):
+        chunk = np.column_stack([first[start:start + chunk_rows], second[start:start + chunk_rows]])
+        chunk_copies = predict_copies(estimator, scaler, base, columns, change_positions[chunk], change_values[chunk])
+        best_pairs = np.concatenate([best_pairs, chunk])
+        best_copies = np.concatenate([best_copies, chunk_copies])
+        top = np.argsort(best_copies)[::-1][:top_pairs]
+        best_pairs, best_copies = best_pairs[top], best_copies[top]
+
+    variants = [(changes[i], changes[j]) for i, j in best_pairs]
+    result['pairs'] = ranked(game, variants, best_copies, baseline)
+    return result